@@ -1,9 +1,177 @@
+from collections import Counter
+
 from django.contrib import admin
-from .models import *
-
-# Register your models here.
-admin.site.register(User)
-admin.site.register(Listing)
-admin.site.register(Bid)
-admin.site.register(Comment)
-admin.site.register(Watchlist)
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from .caching import adjust_watchlist_count, bump_comments_version, bump_listing_versions
+from .categories import adjust_active_counts
+from .closing import close_listings
+from .models import User, Category, Listing, Bid, BidSummary, Comment, Watchlist
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that never counts a whole large table. An unfiltered list
+    is sized from its highest id, one index lookup, which overestimates by
+    the rows deleted or archived. A filtered one is counted up to
+    COUNT_LIMIT rows, past which its later pages are not offered.
+    """
+
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            return queryset.model._default_manager.order_by("-pk").values_list("pk", flat=True).first() or 0
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelists that stay fast on tables with millions of rows: estimated
+    counts, sorting only by id, and foreign keys edited by raw id rather
+    than from a <select> of every row.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ("-id",)
+    sortable_by = ("id",)
+    # Shows the search box; get_search_results does the searching
+    search_fields = ("id",)
+    search_id_field = "id"
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        A number finds rows by search_id_field, anything else by the exact
+        username of their user. Each is one index lookup, where the default
+        OR across fields and joins scans the table.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(**{self.search_id_field: int(term)}), False
+        user_ids = list(User.objects.filter(username=term).values_list("id", flat=True))
+        return queryset.filter(user_id__in=user_ids), False
+
+
+@admin.register(User)
+class AuctionUserAdmin(UserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Exact matches use the unique index; the default searches scan the table
+    search_fields = ("=username", "=email")
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ("name", "active_count")
+    search_fields = ("name",)
+    ordering = ("name",)
+
+
+@admin.register(Listing)
+class ListingAdmin(LargeTableAdmin):
+    list_display = ("id", "title", "user", "category", "current_price", "bid_count", "is_active", "created_at", "ends_at")
+    list_select_related = ("user", "category")
+    list_filter = ("is_active",)
+    search_help_text = "Search by listing id or seller username."
+    raw_id_fields = ("user", "leading_bid", "leading_bidder", "winner")
+    autocomplete_fields = ("category",)
+    readonly_fields = ("bid_count", "leading_bid", "leading_bidder", "winner", "closed_at")
+    actions = ("close_selected", "purge_comments")
+
+    def save_model(self, request, obj, form, change):
+        """
+        Save the listing and keep what depends on it current: category
+        active counts, My Bids and the cached pages. Unchecking is_active
+        closes the listing through close_listings, as the action does.
+        """
+        previous = Listing.objects.filter(pk=obj.pk).values("is_active", "category_id").first() if change else None
+        was_active = bool(previous and previous["is_active"])
+        closing = was_active and not obj.is_active
+        with transaction.atomic():
+            if closing:
+                obj.is_active = True
+            elif previous and not was_active and obj.is_active:
+                obj.winner, obj.closed_at = None, None
+                BidSummary.objects.filter(listing_id=obj.pk).update(is_closed=False)
+            super().save_model(request, obj, form, change)
+            adjust_active_counts([previous["category_id"]] if was_active else [], -1)
+            adjust_active_counts([obj.category_id] if obj.is_active else [], 1)
+            if closing:
+                close_listings(Listing.objects.filter(pk=obj.pk))
+                obj.refresh_from_db()
+            transaction.on_commit(lambda: bump_listing_versions([obj.pk]))
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Listing.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset.values_list("id", "is_active", "category_id"))
+            ids = [listing_id for listing_id, _, _ in rows]
+            watchers = Counter(Watchlist.objects.filter(listing_id__in=ids).values_list("user_id", flat=True))
+            super().delete_queryset(request, queryset)
+            adjust_active_counts([category_id for _, is_active, category_id in rows if is_active], -1)
+            transaction.on_commit(lambda: _forget_listings(ids, watchers))
+
+    @admin.action(description="Close selected listings")
+    def close_selected(self, request, queryset):
+        closed = close_listings(queryset)
+        self.message_user(request, f"Closed {closed} listings.")
+
+    @admin.action(description="Delete all comments on selected listings")
+    def purge_comments(self, request, queryset):
+        comments = Comment.objects.filter(listing__in=queryset.values("id"))
+        with transaction.atomic():
+            listing_ids = list(comments.values_list("listing_id", flat=True).distinct())
+            # A single DELETE: nothing refers to comments
+            deleted, _ = comments.delete()
+            transaction.on_commit(lambda: _forget_comments(listing_ids))
+        self.message_user(request, f"Deleted {deleted} comments from {len(listing_ids)} listings.")
+
+
+def _forget_listings(listing_ids, watchers):
+    bump_listing_versions(listing_ids)
+    for user_id, count in watchers.items():
+        adjust_watchlist_count(user_id, -count)
+
+
+def _forget_comments(listing_ids):
+    for listing_id in listing_ids:
+        bump_comments_version(listing_id)
+    bump_listing_versions(listing_ids, feed=False)
+
+
+@admin.register(Bid)
+class BidAdmin(LargeTableAdmin):
+    list_display = ("id", "listing", "user", "amount")
+    list_select_related = ("listing", "user")
+    search_id_field = "listing_id"
+    search_help_text = "Search by listing id or username."
+    raw_id_fields = ("listing", "user")
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ("id", "listing", "user", "comment")
+    list_select_related = ("listing", "user")
+    search_id_field = "listing_id"
+    search_help_text = "Search by listing id or username."
+    raw_id_fields = ("listing", "user")
+
+
+@admin.register(Watchlist)
+class WatchlistAdmin(LargeTableAdmin):
+    list_display = ("id", "user", "listing")
+    list_select_related = ("user", "listing")
+    search_id_field = "listing_id"
+    search_help_text = "Search by listing id or username."
+    raw_id_fields = ("user", "listing")
@@ -0,0 +1,164 @@
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .models import Listing, Bid, Comment
+from .pagination import astream, stream
+
+# Read-only JSON versions of the listing data. Each resource maps the field
+# names clients may ask for with ?fields= to the column each is read from;
+# only the requested columns are selected.
+
+LISTING_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "description": "description",
+    "starting_bid": "starting_bid",
+    "current_price": "current_price",
+    "bid_count": "bid_count",
+    "is_active": "is_active",
+    "created_at": "created_at",
+    "ends_at": "ends_at",
+    "image_url": "image_url",
+    "category": "category__name",
+    "seller": "user__username",
+    "leading_bidder": "leading_bidder__username",
+    "winner": "winner__username",
+}
+
+BID_FIELDS = {
+    "id": "id",
+    "amount": "amount",
+    "bidder": "user__username",
+}
+
+COMMENT_FIELDS = {
+    "id": "id",
+    "comment": "comment",
+    "user": "user__username",
+}
+
+# Rows serialized per chunk of a streamed response
+CHUNK_ROWS = 100
+
+
+@require_GET
+def listings(request):
+    queryset = Listing.objects.filter(is_active=True)
+    category_name = request.GET.get("category")
+    if category_name:
+        queryset = queryset.filter(category__name=category_name)
+    return page_response(request, queryset, LISTING_FIELDS, ("-created_at", "-id"))
+
+
+@require_GET
+def listing(request, id):
+    try:
+        names = selected_fields(request, LISTING_FIELDS)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    row = Listing.objects.filter(pk=id).values(*columns(names, LISTING_FIELDS)).first()
+    if row is None:
+        return JsonResponse({"error": "No such listing."}, status=404)
+    return JsonResponse(select(row, names, LISTING_FIELDS))
+
+
+@require_GET
+def bids(request, id):
+    if not Listing.objects.filter(pk=id).exists():
+        return JsonResponse({"error": "No such listing."}, status=404)
+    # Newest first, read backwards along the (listing, id) index
+    return page_response(request, Bid.objects.filter(listing_id=id), BID_FIELDS, ("-id",))
+
+
+@require_GET
+def comments(request, id):
+    if not Listing.objects.filter(pk=id).exists():
+        return JsonResponse({"error": "No such listing."}, status=404)
+    return page_response(request, Comment.objects.filter(listing_id=id), COMMENT_FIELDS, ("id",))
+
+
+def page_response(request, queryset, fields, ordering):
+    """
+    Stream one cursor page of queryset as {"results", "next", "previous"}.
+    Each page is one indexed range read of at most API_MAX_PAGE_SIZE rows,
+    serialized as it is read, so neither the response time nor the memory
+    used depends on how many rows precede the cursor. Under ASGI the rows
+    are read by an async iterator, because Django buffers a synchronous
+    one whole before sending it.
+    """
+    try:
+        names = selected_fields(request, fields)
+    except ValueError as error:
+        return JsonResponse({"error": str(error)}, status=400)
+
+    # The ordering columns are read too, to make the cursors from
+    values = queryset.values(*columns(names, fields, [name.lstrip("-") for name in ordering]))
+    if isinstance(request, ASGIRequest):
+        page = astream(values, ordering, cursor=request.GET.get("cursor"), per_page=page_size(request))
+        content = aencode_page(page, names, fields)
+    else:
+        page = stream(values, ordering, cursor=request.GET.get("cursor"), per_page=page_size(request))
+        content = encode_page(page, names, fields)
+    return StreamingHttpResponse(content, content_type="application/json")
+
+
+def encode_page(page, names, fields):
+    yield '{"results":['
+    chunk = []
+    separator = ""
+    for row in page:
+        chunk.append(separator + json.dumps(select(row, names, fields), cls=DjangoJSONEncoder))
+        separator = ","
+        if len(chunk) == CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    # The cursors are known once the page has been read
+    chunk.append(f'],"next":{json.dumps(page.next_cursor)},"previous":{json.dumps(page.previous_cursor)}}}')
+    yield "".join(chunk)
+
+
+async def aencode_page(page, names, fields):
+    """Asynchronous encode_page()."""
+    yield '{"results":['
+    chunk = []
+    separator = ""
+    async for row in page:
+        chunk.append(separator + json.dumps(select(row, names, fields), cls=DjangoJSONEncoder))
+        separator = ","
+        if len(chunk) == CHUNK_ROWS:
+            yield "".join(chunk)
+            chunk = []
+    chunk.append(f'],"next":{json.dumps(page.next_cursor)},"previous":{json.dumps(page.previous_cursor)}}}')
+    yield "".join(chunk)
+
+
+def selected_fields(request, fields):
+    names = [name.strip() for name in request.GET.get("fields", "").split(",") if name.strip()]
+    if not names:
+        return list(fields)
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(fields)}.")
+    return names
+
+
+def columns(names, fields, extra=()):
+    return list(dict.fromkeys([fields[name] for name in names] + list(extra)))
+
+
+def select(row, names, fields):
+    return {name: row[fields[name]] for name in names}
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get("limit", settings.API_PAGE_SIZE))
+    except ValueError:
+        size = settings.API_PAGE_SIZE
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
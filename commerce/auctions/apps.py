@@ -1,5 +1,27 @@
 from django.apps import AppConfig
+from django.contrib.auth.signals import user_logged_out
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def install_search_index(using, **kwargs):
+    from . import search
+
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        search.install(connection)
 
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        from .backends import forget_user
+        from .instrumentation import install_query_recorder
+
+        post_migrate.connect(install_search_index, sender=self)
+        connection_created.connect(install_query_recorder)
+        post_save.connect(forget_user, sender="auctions.User")
+        post_delete.connect(forget_user, sender="auctions.User")
+        user_logged_out.connect(forget_user)
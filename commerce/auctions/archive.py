@@ -0,0 +1,94 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .caching import adjust_watchlist_count, bump_listing_versions
+from .models import (
+    Listing, Bid, BidSummary, Comment, Watchlist, ArchivedListing, ArchivedBid, ArchivedBidSummary, ArchivedComment,
+)
+
+# Listings moved per transaction. Every statement lists their ids, which
+# must stay under SQLite's limit on query parameters.
+BATCH_SIZE = 500
+
+# Each archive table and the live table its rows are moved from, in the
+# order they are copied. The archive tables' columns are a subset of the
+# live ones, under the same names.
+MOVES = [
+    (Listing, ArchivedListing, "id"),
+    (Bid, ArchivedBid, "listing_id"),
+    (BidSummary, ArchivedBidSummary, "listing_id"),
+    (Comment, ArchivedComment, "listing_id"),
+]
+
+
+def archive_closed_listings(before=None, batch_size=BATCH_SIZE):
+    """
+    Move the listings closed before before (by default ARCHIVE_AFTER_DAYS
+    ago) into the archive tables with their bids, comments and My Bids
+    rows, batch_size listings per transaction, and drop them from
+    watchlists.
+    Returns the number of listings archived.
+    """
+    before = before or timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    closed = Listing.objects.filter(is_active=False, closed_at__lte=before).order_by("closed_at")
+    return archive_listings(closed, batch_size)
+
+
+def archive_listings(listings, batch_size=BATCH_SIZE):
+    """
+    Archive the closed listings in the queryset, batch_size of them per
+    transaction until none are left, so no statement lists more ids than
+    SQLite takes and no transaction grows with the backlog. Returns the
+    number of listings archived.
+    """
+    archived = 0
+    while True:
+        batch = _archive_batch(listings, batch_size)
+        archived += batch
+        if batch < batch_size:
+            return archived
+
+
+def _archive_batch(listings, limit):
+    """
+    Archive at most limit of the closed listings in the queryset in one
+    transaction. Each table is copied with one INSERT ... SELECT and
+    emptied with one DELETE.
+    """
+    with transaction.atomic():
+        ids = listings.filter(is_active=False).select_for_update(skip_locked=True).values_list("id", flat=True)
+        ids = list(ids[:limit])
+        if not ids:
+            return 0
+
+        watchers = Counter(Watchlist.objects.filter(listing_id__in=ids).values_list("user_id", flat=True))
+        placeholders = ", ".join(["%s"] * len(ids))
+        with connection.cursor() as cursor:
+            for live, archive, column in MOVES:
+                columns = ", ".join(connection.ops.quote_name(field.column) for field in archive._meta.concrete_fields)
+                cursor.execute(
+                    f"INSERT INTO {archive._meta.db_table} ({columns}) "
+                    f"SELECT {columns} FROM {live._meta.db_table} WHERE {column} IN ({placeholders})",
+                    ids,
+                )
+            # Raw deletes: the ORM would load every bid first, to clear
+            # Listing.leading_bid, which is deleted along with them anyway
+            for live, column in [
+                (Watchlist, "listing_id"), (BidSummary, "listing_id"), (Comment, "listing_id"), (Bid, "listing_id"), (Listing, "id"),
+            ]:
+                cursor.execute(f"DELETE FROM {live._meta.db_table} WHERE {column} IN ({placeholders})", ids)
+
+        transaction.on_commit(lambda: _forget(ids, watchers))
+
+    return len(ids)
+
+
+def _forget(ids, watchers):
+    # The pages re-render from the archive; the lists no longer show them
+    bump_listing_versions(ids, feed=False)
+    for user_id, count in watchers.items():
+        adjust_watchlist_count(user_id, -count)
@@ -0,0 +1,151 @@
+import asyncio
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+
+from .caching import awatchlist_count, cache_anonymous_page, feed_version, page_etag, page_last_modified
+from .models import Category, Listing, Comment, Watchlist, ArchivedListing, ArchivedComment
+from .pagination import apaginate
+from .views import comments_cache_key, comments_page_number, listing_page_version
+
+# Async versions of the read-heavy pages in views.py, used instead of them
+# when ASYNC_READ_VIEWS is set. Under an ASGI server they run on the event
+# loop rather than each holding a thread for the whole request.
+
+
+def resolve_user(view):
+    """
+    Load the signed-in user and their watchlist count asynchronously, so
+    that the decorators, templates and context processors that use them
+    later in the request find them without a query.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await request.auser()
+        if request.user.is_authenticated:
+            request.watchlist_count = await awatchlist_count(request.user.id)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@resolve_user
+@condition(etag_func=page_etag(feed_version), last_modified_func=page_last_modified(feed_version))
+@cache_anonymous_page(feed_version)
+async def index(request):
+    category_name = request.GET.get('category')
+    listings = Listing.objects.filter(is_active=True)
+    if category_name:
+        listings = listings.filter(category__name=category_name)
+
+    page = await apaginate(
+        listings,
+        ("-created_at", "-id"),
+        cursor=request.GET.get("cursor"),
+        per_page=settings.LISTINGS_PER_PAGE,
+    )
+
+    return render(request, "auctions/index.html", {
+        "listings": page,
+        "category_name": category_name,
+    })
+
+
+@resolve_user
+async def categories(request):
+    return render(request, "auctions/categories.html", {
+        "categories": [category async for category in Category.objects.order_by("name")],
+    })
+
+
+@resolve_user
+@condition(
+    etag_func=page_etag(listing_page_version, for_users=False),
+    last_modified_func=page_last_modified(listing_page_version, for_users=False),
+)
+@cache_anonymous_page(listing_page_version)
+async def listings(request, id):
+    # None of these depend on each other, so they are issued together
+    try:
+        listing, watchlisted, comments = await asyncio.gather(
+            Listing.objects.select_related("user", "category").aget(pk=id),
+            watchlisted_by(request.user, id),
+            comment_thread(request, id),
+        )
+    except Listing.DoesNotExist:
+        return await archived_listing(request, id)
+
+    return render(request, "auctions/listings.html", {
+        "listing": listing,
+        "watchlisted": watchlisted,
+        "comments": comments,
+    })
+
+
+async def archived_listing(request, id):
+    """Asynchronous views.archived_listing()."""
+    try:
+        listing = await ArchivedListing.objects.select_related("user", "category").aget(pk=id)
+    except ArchivedListing.DoesNotExist:
+        raise Http404("No such listing.")
+
+    comments = ArchivedComment.objects.filter(listing=listing).select_related("user").order_by("id")
+    paginator = Paginator(comments, settings.COMMENTS_PER_PAGE)
+    paginator.count = await comments.acount()
+    try:
+        number = paginator.validate_number(comments_page_number(request))
+    except EmptyPage:
+        number = paginator.num_pages
+    bottom = (number - 1) * paginator.per_page
+    page = Page([comment async for comment in comments[bottom:bottom + paginator.per_page]], number, paginator)
+    return render(request, "auctions/listings.html", {
+        "listing": listing,
+        "archived": True,
+        "comments": mark_safe(render_to_string("auctions/comments.html", {"comments": page})),
+    })
+
+
+async def watchlisted_by(user, listing_id):
+    if not user.is_authenticated:
+        return False
+    return await Watchlist.objects.filter(user=user, listing_id=listing_id).aexists()
+
+
+async def comment_thread(request, listing_id):
+    """Asynchronous views.comment_thread(), sharing its cache."""
+    page_number = comments_page_number(request)
+    key = comments_cache_key(listing_id, page_number)
+    html = cache.get(key)
+    if html is None:
+        comments = Comment.objects.using(DEFAULT_DB_ALIAS).filter(listing_id=listing_id).select_related("user").order_by("id")
+        paginator = Paginator(comments, settings.COMMENTS_PER_PAGE)
+        paginator.count = await comments.acount()
+        try:
+            number = paginator.validate_number(page_number)
+        except EmptyPage:
+            number = paginator.num_pages
+        bottom = (number - 1) * paginator.per_page
+        page = Page([comment async for comment in comments[bottom:bottom + paginator.per_page]], number, paginator)
+        html = render_to_string("auctions/comments.html", {"comments": page})
+        cache.set(key, html, settings.COMMENTS_CACHE_TIMEOUT)
+
+    return mark_safe(html)
+
+
+@resolve_user
+@login_required
+async def watchlist(request):
+    return render(request, "auctions/watchlist.html", {
+        "watchlists": [
+            entry async for entry in
+            Watchlist.objects.filter(user=request.user).select_related("listing").order_by("-id")
+        ],
+    })
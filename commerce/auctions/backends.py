@@ -0,0 +1,35 @@
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_TIMEOUT = 300
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that caches the user loaded for each request, so a signed-in
+    page view does not query for its own user. The cached user is dropped
+    whenever the user is saved or deleted, which covers password changes,
+    and on logout.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
+
+
+def forget_user(sender, instance=None, user=None, update_fields=None, **kwargs):
+    # Signing in only records last_login, which nothing reads from the cache
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    user = instance or user
+    if user is not None and user.pk is not None:
+        cache.delete(user_cache_key(user.pk))
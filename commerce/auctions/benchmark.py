@@ -0,0 +1,313 @@
+import asyncio
+import contextlib
+import itertools
+import statistics
+import threading
+import time
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from . import bidding
+from .models import User, Category, Listing, Comment
+from .seed import PASSWORD
+
+# The most SQL queries each route may run once caches are warm, counting
+# BEGIN/COMMIT. Signed-in sessions and users come from the cache. Raise a
+# budget only when a view genuinely needs more data, never to absorb a
+# per-row query.
+QUERY_BUDGETS = {
+    "index": 1,
+    "login": 9,
+    "logout": 3,
+    "register": 10,
+    "search": 2,
+    "categories": 1,
+    "create_listing": 5,
+    "close_listing": 4,
+    "listings": 2,
+    "listing_events": 0,
+    "watchlist": 1,
+    "my_bids": 2,
+    "to_watchlist": 4,
+    "place_bid": 5,
+    "add_comment": 2,
+    "delete_comment": 2,
+    "metrics": 0,
+    "api_listings": 1,
+    "api_listing": 1,
+    "api_bids": 2,
+    "api_comments": 2,
+}
+
+
+@contextlib.contextmanager
+def throwaway_database():
+    """
+    Run the block against a freshly migrated test database, destroyed
+    afterwards, so benchmarks never touch the real one.
+    """
+    old_name = connection.settings_dict["NAME"]
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+class Fixtures:
+    """Objects the benchmarked requests act on, created outside the timings."""
+
+    def __init__(self):
+        self.user = User.objects.order_by("id").first()
+        self.listing = Listing.objects.filter(is_active=True).order_by("-bid_count", "id").first()
+        self.category = Category.objects.order_by("id").values_list("name", flat=True).first() or ""
+        self.sequence = itertools.count(1)
+
+    def fresh_listing(self):
+        return Listing.objects.create(
+            title="Benchmark listing", description="Closed by the benchmark",
+            starting_bid=1, current_price=1, user=self.user,
+        )
+
+    def fresh_comment(self):
+        return Comment.objects.create(user=self.user, listing=self.listing, comment="Deleted by the benchmark")
+
+    def next_bid(self):
+        return Listing.objects.values_list("current_price", flat=True).get(pk=self.listing.id) + 1
+
+    def new_username(self):
+        return f"benchmark{time.time_ns()}{next(self.sequence)}"
+
+
+class Route:
+    def __init__(self, name, request, anonymous=False, stream=False):
+        self.name = name
+        self.request = request
+        self.anonymous = anonymous
+        # Streamed responses only run their queries as they are read
+        self.stream = stream
+
+
+# Each request function returns (method, path, data) for one request,
+# creating whatever it consumes beforehand.
+ROUTES = [
+    Route("index", lambda fx: ("get", reverse("index"), None)),
+    Route("search", lambda fx: ("get", reverse("search"), {"q": "listing"})),
+    Route("categories", lambda fx: ("get", reverse("categories"), None)),
+    Route("create_listing", lambda fx: ("post", reverse("create_listing"), {
+        "title": "Benchmark", "description": "Created by the benchmark", "starting_bid": 5, "category": fx.category,
+    })),
+    Route("close_listing", lambda fx: ("get", reverse("close_listing", args=[fx.fresh_listing().id]), None)),
+    Route("listings", lambda fx: ("get", reverse("listings", args=[fx.listing.id]), None)),
+    Route("listing_events", lambda fx: ("get", reverse("listing_events", args=[fx.listing.id]), None)),
+    Route("watchlist", lambda fx: ("get", reverse("watchlist"), None)),
+    Route("my_bids", lambda fx: ("get", reverse("my_bids"), None)),
+    Route("to_watchlist", lambda fx: ("get", reverse("to_watchlist", args=[fx.listing.id]), None)),
+    Route("place_bid", lambda fx: ("post", reverse("place_bid", args=[fx.listing.id]), {"bid": fx.next_bid()})),
+    Route("add_comment", lambda fx: ("post", reverse("add_comment"), {
+        "listing": fx.listing.id, "comment": "Added by the benchmark",
+    })),
+    Route("delete_comment", lambda fx: ("post", reverse("delete_comment"), {"comment_id": fx.fresh_comment().id})),
+    Route("metrics", lambda fx: ("get", reverse("metrics"), None), anonymous=True),
+    Route("api_listings", lambda fx: ("get", reverse("api_listings"), None), anonymous=True, stream=True),
+    Route("api_listing", lambda fx: ("get", reverse("api_listing", args=[fx.listing.id]), None), anonymous=True),
+    Route("api_bids", lambda fx: ("get", reverse("api_bids", args=[fx.listing.id]), None), anonymous=True, stream=True),
+    Route("api_comments", lambda fx: ("get", reverse("api_comments", args=[fx.listing.id]), None), anonymous=True, stream=True),
+    Route("login", lambda fx: ("post", reverse("login"), {"username": fx.user.username, "password": PASSWORD}), anonymous=True),
+    Route("logout", lambda fx: ("get", reverse("logout"), None)),
+    Route("register", lambda fx: ("post", reverse("register"), {
+        "username": fx.new_username(), "email": "benchmark@example.com",
+        "password": PASSWORD, "confirmation": PASSWORD,
+    }), anonymous=True),
+]
+
+
+def measure(route, fixtures, client):
+    """Make one request to route and return (seconds, SQL queries)."""
+    method, path, data = route.request(fixtures)
+    if route.anonymous:
+        client.logout()
+    else:
+        client.force_login(fixtures.user)
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data or {})
+        if route.stream:
+            b"".join(response.streaming_content)
+        elapsed = time.perf_counter() - start
+
+    if response.status_code >= 400:
+        raise AssertionError(f"{route.name} answered {response.status_code}")
+    return elapsed, len(queries)
+
+
+def run(iterations=20, warmup=2, routes=ROUTES):
+    """
+    Request every route warmup + iterations times against the current
+    database and return per-route latency percentiles and query counts.
+    """
+    fixtures = Fixtures()
+    client = Client()
+    results = []
+    for route in routes:
+        for _ in range(warmup):
+            measure(route, fixtures, client)
+        timings, query_counts = [], []
+        for _ in range(iterations):
+            elapsed, queries = measure(route, fixtures, client)
+            timings.append(elapsed)
+            query_counts.append(queries)
+        timings.sort()
+        results.append({
+            "route": route.name,
+            "p50_ms": statistics.median(timings) * 1000,
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            "queries": max(query_counts),
+            "budget": QUERY_BUDGETS.get(route.name),
+        })
+    return results
+
+
+def compete(listing_id, users, bids_per_user):
+    """
+    Have every user bid on the listing bids_per_user times from a thread of
+    its own, all starting together, with interleaved rising amounts so that
+    most bids race another. Returns the accepted amounts, any errors other
+    than refused bids and the seconds taken.
+    """
+    barrier = threading.Barrier(len(users))
+    accepted = []
+    errors = []
+
+    def bid(user, offset):
+        try:
+            barrier.wait()
+            for i in range(bids_per_user):
+                amount = 1 + i * len(users) + offset
+                try:
+                    bidding.place_bid(user, listing_id, amount)
+                except bidding.BidError:
+                    continue
+                accepted.append(amount)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=bid, args=(user, offset)) for offset, user in enumerate(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {"accepted": accepted, "errors": errors, "seconds": time.perf_counter() - start}
+
+
+async def fan_out(broker, subscribers, updates):
+    """
+    Subscribe subscribers streams to listing 1 on broker, publish updates
+    to them from another thread, as bids do, and return the latency of
+    every delivery in seconds.
+    """
+    latencies = []
+
+    async def subscriber():
+        queue = broker.subscribe(1)
+        try:
+            for _ in range(updates):
+                event = await queue.get()
+                latencies.append(time.perf_counter() - event["sent"])
+        finally:
+            broker.unsubscribe(1, queue)
+
+    def publisher():
+        for i in range(updates):
+            broker.publish(1, {"sent": time.perf_counter()})
+            # Queues keep only the latest update, so let every subscriber
+            # receive this one before sending the next.
+            while len(latencies) < (i + 1) * subscribers:
+                time.sleep(0.001)
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(subscribers)]
+    await asyncio.sleep(0)
+    await asyncio.to_thread(publisher)
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+async def asgi_get(app, path, cookie=""):
+    """Make one GET request to an ASGI application in-process and return its status."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("testserver", 80),
+    }
+    sent = False
+    done = asyncio.Event()
+    status = None
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # The client stays connected until the application cancels this
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    await app(scope, receive, send)
+    await done.wait()
+    return status
+
+
+async def load(app, paths, cookies, connections=50, requests=2000):
+    """
+    Issue requests GETs to app from connections concurrent clients, each
+    cycling through paths with its own cookie, and return requests/sec and
+    p50/p99 latency in milliseconds.
+    """
+    latencies = []
+    remaining = itertools.count(requests, -1)
+
+    async def client(number):
+        cookie = cookies[number % len(cookies)]
+        for i in itertools.count(number):
+            if next(remaining) <= 0:
+                return
+            start = time.perf_counter()
+            status = await asgi_get(app, paths[i % len(paths)], cookie)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                raise AssertionError(f"{paths[i % len(paths)]} answered {status}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests_per_sec": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
@@ -0,0 +1,189 @@
+import math
+import random
+import time
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, F, Max, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import live
+from .caching import bump_listing_versions
+from .models import Bid, BidSummary, Listing, OutboxEvent
+
+# How often a bid is retried while the database is locked, and the first pause
+LOCK_RETRIES = 4
+LOCK_BACKOFF_SECONDS = 0.05
+
+
+class BidError(Exception):
+    pass
+
+
+def place_bid(user, listing_id, amount):
+    """
+    Record a bid and make it the listing's current price.
+
+    One conditional INSERT decides the bid: it only adds a row while the
+    bid still beats the price at the moment it runs, so when bids race for
+    the same listing the price never goes backwards, and refused bids write
+    nothing. The listing UPDATE, My Bids and the outbid notification are
+    written in the same transaction, so a bid is recorded whole or not at
+    all. Raises BidError if the bid is refused, and OperationalError if the
+    database stays locked through every retry.
+    """
+    if not math.isfinite(amount):
+        raise BidError("Enter a valid bid amount!")
+
+    placed = _retry_locked(lambda: _apply_bid(user, listing_id, amount))
+    if placed is None:
+        raise BidError(_refusal_reason(listing_id))
+    bid, bid_count = placed
+
+    event = live.listing_event(listing_id, amount, bid_count, user.id)
+    transaction.on_commit(lambda: live.broker.publish(listing_id, event))
+    transaction.on_commit(lambda: bump_listing_versions([listing_id]))
+    return bid
+
+
+def _apply_bid(user, listing_id, amount):
+    """
+    Insert the bid if it wins, move the listing's price to it and record it
+    in My Bids and the outbox, in one short write transaction. Returns the
+    bid and the new bid count, or None if the bid was refused.
+    """
+    winning = Listing.objects.filter(pk=listing_id, is_active=True).filter(
+        Q(ends_at__isnull=True) | Q(ends_at__gt=timezone.now()),
+        Q(current_price__lt=amount) | Q(starting_bid__lte=amount, bid_count=0),
+    ).values_list(Value(user.id), "id", Value(amount))
+    select, params = winning.query.sql_with_params()
+    bid_columns = ", ".join(connection.ops.quote_name(Bid._meta.get_field(name).column) for name in ("user", "listing", "amount"))
+    listing_table = connection.ops.quote_name(Listing._meta.db_table)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # RETURNING reads the listing before the UPDATE below: the
+            # bidder being outbid and the count it increments
+            cursor.execute(
+                f"INSERT INTO {connection.ops.quote_name(Bid._meta.db_table)} ({bid_columns}) {select} "
+                f"RETURNING id, (SELECT leading_bidder_id FROM {listing_table} WHERE id = %s), "
+                f"(SELECT bid_count FROM {listing_table} WHERE id = %s)",
+                (*params, listing_id, listing_id),
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+
+        bid_id, outbid, bid_count = row
+        # The INSERT took the write lock, so the listing is as it read it
+        Listing.objects.filter(pk=listing_id).update(
+            current_price=amount,
+            bid_count=bid_count + 1,
+            leading_bid_id=bid_id,
+            leading_bidder=user,
+        )
+        _record_bid(user, listing_id, amount, outbid)
+    return Bid(id=bid_id, user=user, listing_id=listing_id, amount=amount), bid_count + 1
+
+
+def _record_bid(user, listing_id, amount, outbid):
+    """
+    Make the bid the bidder's highest and leading one in My Bids and, if it
+    outbid someone else, mark them as outbid and queue their notification.
+    Called under the bid's write lock, so the listing cannot change between
+    the bid and these writes.
+    """
+    # Bids only ever rise, so the new bid is the bidder's highest
+    BidSummary.objects.bulk_create(
+        [BidSummary(user=user, listing_id=listing_id, max_bid=amount, is_leading=True, is_closed=False)],
+        update_conflicts=True, unique_fields=["user", "listing"], update_fields=["max_bid", "is_leading"],
+    )
+    if outbid is not None and outbid != user.id:
+        BidSummary.objects.filter(user_id=outbid, listing_id=listing_id).update(is_leading=False)
+        OutboxEvent.objects.create(kind=OutboxEvent.OUTBID, user_id=outbid, listing_id=listing_id, amount=amount)
+
+
+def _retry_locked(func):
+    """
+    Call func, calling it again after a growing, jittered pause while it
+    fails because the database is locked. SQLite does not queue writers
+    waiting on its busy timeout fairly, so under heavy contention one can
+    time out while others keep taking the lock.
+    """
+    for attempt in range(LOCK_RETRIES + 1):
+        try:
+            return func()
+        except OperationalError as error:
+            # Inside an outer transaction a retry cannot take the lock either
+            if attempt == LOCK_RETRIES or connection.in_atomic_block or "locked" not in str(error):
+                raise
+            time.sleep(random.uniform(0.5, 1) * LOCK_BACKOFF_SECONDS * 2 ** attempt)
+
+
+def rebuild_bid_stats(batch_size=1000, listings=None):
+    """
+    Recompute bid_count and the leading bid of every listing (or of the
+    given queryset of listings) from the Bid table, one set-based UPDATE per
+    batch of listings. Returns the number of listings updated.
+    """
+    if listings is None:
+        listings = Listing.objects.all()
+
+    bids = Bid.objects.filter(listing=OuterRef("pk"))
+    leading = bids.order_by("-amount", "id")
+    stats = {
+        "bid_count": Coalesce(Subquery(bids.order_by().values("listing").annotate(n=Count("pk")).values("n")), 0),
+        "leading_bid": Subquery(leading.values("pk")[:1]),
+        "leading_bidder": Subquery(leading.values("user")[:1]),
+    }
+
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(listings.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return updated
+        with transaction.atomic():
+            updated += listings.filter(pk__gte=ids[0], pk__lte=ids[-1]).update(**stats)
+        last_id = ids[-1]
+
+
+def rebuild_bid_summaries(batch_size=1000):
+    """
+    Recompute every BidSummary from the Bid table, one grouped read and
+    one bulk insert per batch of listings. Returns the number of summaries.
+    """
+    BidSummary.objects.all().delete()
+    summaries = Bid.objects.values("user", "listing").annotate(
+        max_bid=Max("amount"),
+        is_leading=ExpressionWrapper(Q(listing__leading_bidder=F("user")), output_field=BooleanField()),
+        is_closed=ExpressionWrapper(Q(listing__is_active=False), output_field=BooleanField()),
+    ).order_by()
+
+    created = 0
+    last_id = 0
+    while True:
+        ids = list(Listing.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return created
+        with transaction.atomic():
+            created += len(BidSummary.objects.bulk_create(
+                [
+                    BidSummary(user_id=row["user"], listing_id=row["listing"], max_bid=row["max_bid"],
+                               is_leading=row["is_leading"], is_closed=row["is_closed"])
+                    for row in summaries.filter(listing__gte=ids[0], listing__lte=ids[-1])
+                ],
+                # Bids placed while the rebuild runs have already upserted theirs
+                update_conflicts=True, unique_fields=["user", "listing"],
+                update_fields=["max_bid", "is_leading", "is_closed"],
+            ))
+        last_id = ids[-1]
+
+
+def _refusal_reason(listing_id):
+    listing = Listing.objects.filter(pk=listing_id, is_active=True).first()
+    if listing is None or listing.ends_at and listing.ends_at <= timezone.now():
+        return "This listing is no longer active!"
+    if listing.bid_count == 0:
+        return "Bid amount must be at least the starting bid!"
+    return "Bid amount must be greater than the current price!"
@@ -0,0 +1,162 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+
+from .models import Watchlist
+from .routers import read_from_replica
+
+
+def comments_version(listing_id):
+    return cache.get_or_set(f"comments:version:{listing_id}", time.time_ns, settings.VERSION_CACHE_TIMEOUT)
+
+
+def bump_comments_version(listing_id):
+    # A fresh timestamp rather than incr(): if the version key is evicted
+    # before the fragments it guards, a restarted counter could collide with
+    # a stale fragment that is still cached.
+    cache.set(f"comments:version:{listing_id}", time.time_ns(), settings.VERSION_CACHE_TIMEOUT)
+
+
+def watchlist_count(user_id):
+    key = f"watchlist:count:{user_id}"
+    count = cache.get(key)
+    if count is None:
+        count = Watchlist.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).count()
+        cache.set(key, count)
+    return count
+
+
+async def awatchlist_count(user_id):
+    key = f"watchlist:count:{user_id}"
+    count = cache.get(key)
+    if count is None:
+        count = await Watchlist.objects.using(DEFAULT_DB_ALIAS).filter(user_id=user_id).acount()
+        cache.set(key, count)
+    return count
+
+
+def adjust_watchlist_count(user_id, delta):
+    try:
+        cache.incr(f"watchlist:count:{user_id}", delta)
+    except ValueError:
+        # Not cached; the next read counts from the database.
+        pass
+
+
+def listing_version(listing_id):
+    return cache.get_or_set(f"listing:version:{listing_id}", time.time_ns, settings.VERSION_CACHE_TIMEOUT)
+
+
+def feed_version():
+    return cache.get_or_set("feed:version", time.time_ns, settings.VERSION_CACHE_TIMEOUT)
+
+
+def bump_listing_versions(listing_ids, feed=True):
+    """
+    Mark the pages of the given listings, and unless feed is False the
+    listing feed, as changed. Call it once the change is committed, or a
+    page rendered from the old rows could be cached under the new version.
+    """
+    stamp = time.time_ns()
+    versions = {f"listing:version:{listing_id}": stamp for listing_id in listing_ids}
+    if feed:
+        versions["feed:version"] = stamp
+    cache.set_many(versions, settings.VERSION_CACHE_TIMEOUT)
+
+
+def _has_messages(request):
+    # len() looks at pending messages without marking them as shown
+    return len(messages.get_messages(request)) > 0
+
+
+def page_etag(version_func, for_users=True):
+    """
+    An etag_func for django.views.decorators.http.condition: the page's
+    version, plus, for signed-in users, who they are and their watchlist
+    count, which every page shows. None while messages are waiting to be
+    shown, so those pages are always rendered. Pass for_users=False for
+    pages that show signed-in users forms: those carry the CSRF token,
+    which rotates on login, and state such as whether the listing is on
+    their watchlist, which no version covers.
+    """
+    def etag(request, *args, **kwargs):
+        if _has_messages(request) or request.user.is_authenticated and not for_users:
+            return None
+        version = version_func(*args, **kwargs)
+        if request.user.is_authenticated:
+            count = getattr(request, "watchlist_count", None)
+            if count is None:
+                count = watchlist_count(request.user.id)
+            return f"{version}.{request.user.id}.{count}"
+        return str(version)
+    return etag
+
+
+def page_last_modified(version_func, for_users=True):
+    def last_modified(request, *args, **kwargs):
+        if _has_messages(request) or request.user.is_authenticated and not for_users:
+            return None
+        return datetime.fromtimestamp(version_func(*args, **kwargs) / 1e9, timezone.utc)
+    return last_modified
+
+
+def cache_anonymous_page(version_func):
+    """
+    Serve anonymous GET requests for the decorated view, sync or async,
+    from a cache of rendered pages, keyed by the full path and the page's
+    version, for PAGE_CACHE_TIMEOUT seconds.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                key = _page_key(request, version_func, args, kwargs)
+                cached = cache.get(key) if key else None
+                if cached is not None:
+                    return _cached_page(cached)
+                response = await view(request, *args, **kwargs)
+                _store_page(request, key, response)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = _page_key(request, version_func, args, kwargs)
+            cached = cache.get(key) if key else None
+            if cached is not None:
+                return _cached_page(cached)
+            response = view(request, *args, **kwargs)
+            _store_page(request, key, response)
+            return response
+        return wrapper
+    return decorator
+
+
+def _page_key(request, version_func, args, kwargs):
+    if request.method != "GET" or request.user.is_authenticated or _has_messages(request):
+        return None
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"page:{version_func(*args, **kwargs)}:{path}"
+
+
+def _cached_page(cached):
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def _store_page(request, key, response):
+    # Pages with a CSRF token belong to one browser, and a page read from a
+    # lagging replica could outlive the lag under the current version
+    if (
+        key and response.status_code == 200 and not response.streaming
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE") and not read_from_replica()
+    ):
+        cache.set(key, (response.content, response["Content-Type"]), settings.PAGE_CACHE_TIMEOUT)
@@ -0,0 +1,25 @@
+from collections import Counter
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Category, Listing
+
+
+def adjust_active_counts(category_ids, delta):
+    """
+    Add delta to the active_count of each category in category_ids, once per
+    occurrence, with one UPDATE per distinct category. None is ignored, so
+    callers can pass the category_id of every listing they opened or closed.
+    """
+    for category_id, count in Counter(id for id in category_ids if id is not None).items():
+        Category.objects.filter(pk=category_id).update(active_count=F("active_count") + delta * count)
+
+
+def rebuild_active_counts():
+    """Recount every category's active listings in one UPDATE. Returns the number of categories."""
+    active = (
+        Listing.objects.filter(category=OuterRef("pk"), is_active=True)
+        .order_by().values("category").annotate(count=Count("pk")).values("count")
+    )
+    return Category.objects.update(active_count=Coalesce(Subquery(active), 0))
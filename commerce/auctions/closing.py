@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import live
+from .caching import bump_listing_versions
+from .categories import adjust_active_counts
+from .models import BidSummary, Listing, OutboxEvent
+
+
+def close_listings(listings, limit=None):
+    """
+    Close the active listings in the queryset (at most limit of them) with
+    one UPDATE that also records each listing's leading bidder as its
+    winner, queue a notification for each winner, and take them off their
+    categories' active counts. Returns the number of listings closed.
+    """
+    with transaction.atomic():
+        rows = listings.filter(is_active=True).select_for_update(skip_locked=True).values(
+            "id", "current_price", "bid_count", "leading_bidder_id", "category_id"
+        )
+        rows = list(rows[:limit] if limit else rows)
+        if not rows:
+            return 0
+
+        Listing.objects.filter(pk__in=[row["id"] for row in rows]).update(
+            is_active=False, winner=F("leading_bidder"), closed_at=timezone.now()
+        )
+        adjust_active_counts([row["category_id"] for row in rows], -1)
+        bid_on = [row["id"] for row in rows if row["bid_count"]]
+        if bid_on:
+            BidSummary.objects.filter(listing_id__in=bid_on).update(is_closed=True)
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(kind=OutboxEvent.WON, user_id=row["leading_bidder_id"], listing_id=row["id"], amount=row["current_price"])
+            for row in rows if row["leading_bidder_id"] is not None
+        ])
+
+        events = [
+            live.listing_event(row["id"], row["current_price"], row["bid_count"], row["leading_bidder_id"], False)
+            for row in rows
+        ]
+        transaction.on_commit(lambda: _publish(events))
+        transaction.on_commit(lambda: bump_listing_versions([row["id"] for row in rows]))
+
+    return len(rows)
+
+
+def close_expired_listings(now=None, batch_size=1000):
+    """
+    Close every active listing whose ends_at has passed, batch_size at a time.
+    Each batch is one indexed range read and one UPDATE.
+    """
+    now = now or timezone.now()
+    expired = Listing.objects.filter(is_active=True, ends_at__lte=now).order_by("ends_at")
+
+    closed = 0
+    while True:
+        batch = close_listings(expired, limit=batch_size)
+        closed += batch
+        if batch < batch_size:
+            return closed
+
+
+def _publish(events):
+    for event in events:
+        live.broker.publish(event["listing"], event)
@@ -1,6 +1,9 @@
-from .models import Watchlist
+from . import caching
 
 def watchlist_count(request):
     if request.user.is_authenticated:
-        return {"watchlist_count": Watchlist.objects.filter(user=request.user).count()}
+        # Async views count it ahead of rendering, where a query would fail
+        if hasattr(request, "watchlist_count"):
+            return {"watchlist_count": request.watchlist_count}
+        return {"watchlist_count": caching.watchlist_count(request.user.id)}
     return {"watchlist_count": 0}
\ No newline at end of file
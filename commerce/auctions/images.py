@@ -0,0 +1,87 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+# The size listing_card.html declares for thumbnails
+THUMBNAIL_SIZE = (300, 200)
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+
+
+def make_thumbnails(source, size=THUMBNAIL_SIZE):
+    """
+    Write a JPEG and a WebP thumbnail of the image at path source, cropped
+    to fill size, next to it. Returns the two paths. Runs in a worker
+    process, so it touches only the filesystem.
+    """
+    root = os.path.splitext(source)[0]
+    jpeg, webp = f"{root}-{size[0]}x{size[1]}.jpg", f"{root}-{size[0]}x{size[1]}.webp"
+    with Image.open(source) as image:
+        image.draft("RGB", (size[0] * 2, size[1] * 2))
+        thumbnail = ImageOps.fit(ImageOps.exif_transpose(image).convert("RGB"), size, Image.LANCZOS)
+    thumbnail.save(jpeg, "JPEG", quality=80, optimize=True, progressive=True)
+    thumbnail.save(webp, "WEBP", quality=75, method=4)
+    return jpeg, webp
+
+
+def generate_thumbnails(listing_id):
+    """
+    Make the thumbnails of a listing's uploaded image in the worker pool
+    and record them on the listing when they are written. With
+    IMAGE_WORKERS = 0 they are made in this process before returning.
+    """
+    from .models import Listing
+
+    image = Listing.objects.values_list("image", flat=True).get(pk=listing_id)
+    if not image:
+        return
+    source = default_storage.path(image)
+
+    workers = settings.IMAGE_WORKERS
+    if not workers:
+        record_thumbnails(listing_id, make_thumbnails(source))
+        return
+
+    future = _get_pool(workers).submit(make_thumbnails, source)
+    future.add_done_callback(lambda future: _record_result(listing_id, future))
+
+
+def generate_thumbnails_on_commit(listing_id):
+    transaction.on_commit(lambda: generate_thumbnails(listing_id))
+
+
+def _get_pool(workers):
+    global _pool
+    if _pool is None:
+        # Spawned rather than forked: forking a threaded server process
+        # would copy its locks and database connections into the workers.
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _record_result(listing_id, future):
+    # Usually called on the pool's result thread, which keeps one database
+    # connection of its own for recording every pool result
+    if future.exception() is None:
+        record_thumbnails(listing_id, future.result())
+    else:
+        logger.error("Could not make thumbnails for listing %s", listing_id, exc_info=future.exception())
+
+
+def record_thumbnails(listing_id, paths):
+    from .caching import bump_listing_versions
+    from .models import Listing
+
+    root = os.path.join(default_storage.location, "")
+    jpeg, webp = (os.path.relpath(path, root).replace(os.sep, "/") for path in paths)
+    Listing.objects.filter(pk=listing_id).update(thumbnail=jpeg, thumbnail_webp=webp)
+    # Cards on the feed switch to the thumbnail
+    bump_listing_versions([])
@@ -0,0 +1,222 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.template.backends.django import DjangoTemplates, Template
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class RequestTimings:
+    __slots__ = ("queries", "db", "template", "context", "rendering")
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.context = 0.0
+        self.rendering = False
+
+
+# The timings of the request being handled. Context variables follow the
+# request into sync_to_async threads, so async views are measured too.
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query's time to the current request."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - start
+        timings.queries += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    # connection_created fires again whenever a wrapper reconnects
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = _current.get()
+        # Templates rendered while another is rendering are already timed
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template += time.perf_counter() - start
+            timings.rendering = False
+
+
+def timed_context_processor(processor):
+    def wrapper(request):
+        timings = _current.get()
+        if timings is None:
+            return processor(request)
+        start = time.perf_counter()
+        try:
+            return processor(request)
+        finally:
+            timings.context += time.perf_counter() - start
+    return wrapper
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing renders and context processors."""
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.engine.template_context_processors = tuple(
+            timed_context_processor(processor) for processor in self.engine.template_context_processors
+        )
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, route):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{route="{route}",le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{route="{route}"}} {self.sum:.6f}'
+        yield f'{name}_count{{route="{route}"}} {cumulative}'
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db = 0.0
+        self.template = 0.0
+        self.context = 0.0
+
+
+class Registry:
+    """Per-route request metrics for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def observe(self, route, duration, timings):
+        with self._lock:
+            metrics = self._routes.get(route)
+            if metrics is None:
+                metrics = self._routes[route] = RouteMetrics()
+            metrics.duration.observe(duration)
+            metrics.queries.observe(timings.queries)
+            metrics.db += timings.db
+            metrics.template += timings.template
+            metrics.context += timings.context
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP auctions_request_duration_seconds Time spent handling requests.",
+                "# TYPE auctions_request_duration_seconds histogram",
+            ]
+            for route, metrics in routes:
+                lines.extend(metrics.duration.lines("auctions_request_duration_seconds", route))
+            lines += [
+                "# HELP auctions_request_queries SQL queries run per request.",
+                "# TYPE auctions_request_queries histogram",
+            ]
+            for route, metrics in routes:
+                lines.extend(metrics.queries.lines("auctions_request_queries", route))
+            for name, attribute, help_text in [
+                ("auctions_request_db_seconds_total", "db", "Time spent running SQL queries."),
+                ("auctions_request_template_seconds_total", "template", "Time spent rendering templates."),
+                ("auctions_request_context_processor_seconds_total", "context", "Time spent in context processors, part of template time."),
+            ]:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for route, metrics in routes:
+                    lines.append(f'{name}{{route="{route}"}} {getattr(metrics, attribute):.6f}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class TimingMiddleware:
+    """
+    Measure each request's SQL queries, database time, template rendering
+    time and total handling time, send them to the client in a
+    Server-Timing header and add them to the per-route metrics. The total
+    covers the middleware below this one, the view and rendering. Streaming
+    responses are measured until the response is returned, before any of
+    their content is produced, so their queries and time are left out.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, time.perf_counter() - start, timings)
+
+    def finish(self, request, response, duration, timings):
+        match = request.resolver_match
+        registry.observe(match.url_name if match and match.url_name else "unmatched", duration, timings)
+        response["Server-Timing"] = ", ".join([
+            f"db;desc=\"{timings.queries} queries\";dur={timings.db * 1000:.2f}",
+            f"tpl;dur={timings.template * 1000:.2f}",
+            f"ctx;dur={timings.context * 1000:.2f}",
+            f"request;dur={duration * 1000:.2f}",
+        ])
+        return response
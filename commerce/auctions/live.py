@@ -0,0 +1,79 @@
+import asyncio
+import json
+import threading
+
+
+class Broker:
+    """
+    In-process fan-out of listing updates to Server-Sent Events streams.
+
+    Subscribers are asyncio queues, grouped by the event loop they live on.
+    publish() may be called from any thread and schedules one callback per
+    loop, which then delivers to every subscriber of the listing on that
+    loop, so a bid costs one cross-thread wakeup per worker rather than one
+    per subscriber. Idle subscribers cost a queue and nothing else. Queues
+    hold only the latest update: a slow client skips stale prices instead
+    of buffering them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, listing_id):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.setdefault(listing_id, {}).setdefault(loop, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, listing_id, queue):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            loops = self._subscribers.get(listing_id, {})
+            queues = loops.get(loop, set())
+            queues.discard(queue)
+            if not queues:
+                loops.pop(loop, None)
+            if not loops:
+                self._subscribers.pop(listing_id, None)
+
+    def subscriber_count(self, listing_id):
+        with self._lock:
+            return sum(len(queues) for queues in self._subscribers.get(listing_id, {}).values())
+
+    def publish(self, listing_id, event):
+        with self._lock:
+            loops = list(self._subscribers.get(listing_id, {}))
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._deliver, loop, listing_id, event)
+            except RuntimeError:
+                # The loop has been closed
+                with self._lock:
+                    self._subscribers.get(listing_id, {}).pop(loop, None)
+
+    def _deliver(self, loop, listing_id, event):
+        with self._lock:
+            queues = list(self._subscribers.get(listing_id, {}).get(loop, ()))
+        for queue in queues:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+broker = Broker()
+
+
+def listing_event(listing_id, current_price, bid_count, leader_id, is_active=True):
+    return {
+        "listing": listing_id,
+        "current_price": str(current_price),
+        "bid_count": bid_count,
+        "leader": leader_id,
+        "is_active": is_active,
+    }
+
+
+def format_event(event):
+    return f"data: {json.dumps(event)}\n\n"
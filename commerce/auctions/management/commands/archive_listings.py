@@ -0,0 +1,24 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.archive import BATCH_SIZE, archive_closed_listings
+
+
+class Command(BaseCommand):
+    help = "Move listings closed longer ago than the retention window, with their bids and comments, to the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=settings.ARCHIVE_AFTER_DAYS, help="Archive listings closed at least this many days ago.")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Listings archived per transaction.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        archived = archive_closed_listings(
+            before=timezone.now() - timedelta(days=options["days"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Archived {archived} closed listings in {time.perf_counter() - start:.2f}s.")
@@ -0,0 +1,58 @@
+import asyncio
+import types
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from auctions import async_views, benchmark, views
+from auctions.models import User, Listing
+from auctions.seed import seed
+from auctions.urls import build_urlpatterns
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and compare requests/sec of the sync "
+        "and async read views under many concurrent connections, driving the "
+        "ASGI application in-process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=100, help="Concurrent clients.")
+        parser.add_argument("--requests", type=int, default=3000, help="Requests per run.")
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--listings", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_database():
+            seed(users=options["users"], listings=options["listings"])
+            # Signed-in clients, so every request reaches the view rather than the anonymous page cache
+            cookies = []
+            for user in User.objects.order_by("id")[:options["connections"]]:
+                client = Client()
+                client.force_login(user)
+                cookies.append(f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}")
+            listing_ids = list(Listing.objects.filter(is_active=True).order_by("-bid_count").values_list("id", flat=True)[:50])
+
+            results = []
+            for name, read_views in [("sync", views), ("async", async_views)]:
+                urlconf = types.ModuleType(f"{name}_urls")
+                urlconf.urlpatterns = build_urlpatterns(read_views)
+                with override_settings(ROOT_URLCONF=urlconf):
+                    paths = [reverse("index"), reverse("categories"), reverse("watchlist")]
+                    paths += [reverse("listings", args=[id]) for id in listing_ids]
+                    app = ASGIHandler()
+                    # Warm the caches and connections first
+                    asyncio.run(benchmark.load(app, paths, cookies, options["connections"], options["connections"] * 2))
+                    results.append((name, asyncio.run(
+                        benchmark.load(app, paths, cookies, options["connections"], options["requests"])
+                    )))
+
+        self.stdout.write(f"{'views':<8}{'req/sec':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, result in results:
+            self.stdout.write(
+                f"{name:<8}{result['requests_per_sec']:>10.0f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}"
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions import benchmark
+from auctions.models import User, Listing, Bid
+
+
+class Command(BaseCommand):
+    help = (
+        "Place competing bids on one listing from several threads against a "
+        "throwaway test database, check the listing ends up consistent and "
+        "report bids/sec."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--bids-per-thread", type=int, default=250)
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_database():
+            users = [User.objects.create_user(f"bidder{i}") for i in range(options["threads"])]
+            listing = Listing.objects.create(
+                title="Watch", description="A watch", starting_bid=1, current_price=1, user=users[0]
+            )
+            result = benchmark.compete(listing.id, users, options["bids_per_thread"])
+            listing.refresh_from_db()
+            bids = Bid.objects.filter(listing=listing).count()
+
+        if result["errors"]:
+            raise CommandError(f"Bidding failed: {result['errors'][0]!r}")
+        if bids != len(result["accepted"]) or listing.current_price != max(result["accepted"]):
+            raise CommandError(f"Inconsistent listing: {bids} bids stored, {len(result['accepted'])} accepted.")
+
+        total = options["threads"] * options["bids_per_thread"]
+        self.stdout.write(
+            f"{total} competing bids ({len(result['accepted'])} accepted) in {result['seconds']:.2f}s: "
+            f"{total / result['seconds']:.0f} bids/sec"
+        )
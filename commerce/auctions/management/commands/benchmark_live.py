@@ -0,0 +1,27 @@
+import asyncio
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from auctions import benchmark, live
+
+
+class Command(BaseCommand):
+    help = (
+        "Open many in-process live update streams on one listing, publish "
+        "updates to them from another thread and report delivery latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--subscribers", type=int, default=5000)
+        parser.add_argument("--updates", type=int, default=20)
+
+    def handle(self, *args, **options):
+        latencies = asyncio.run(benchmark.fan_out(live.Broker(), options["subscribers"], options["updates"]))
+        latencies.sort()
+        self.stdout.write(
+            f"Fan-out to {options['subscribers']} subscribers x {options['updates']} updates: "
+            f"p50 {statistics.median(latencies) * 1000:.1f}ms, "
+            f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f}ms, "
+            f"max {latencies[-1] * 1000:.1f}ms"
+        )
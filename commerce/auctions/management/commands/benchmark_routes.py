@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from auctions import benchmark
+from auctions.seed import seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and report p50/p95 latency and SQL "
+        "queries for every route, against its query budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--listings", type=int, default=5000)
+        parser.add_argument("--bids-per-listing", type=int, default=10)
+        parser.add_argument("--comments-per-listing", type=int, default=20)
+        parser.add_argument("--watchlists-per-user", type=int, default=25)
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per route.")
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_database():
+            seed(
+                users=options["users"],
+                listings=options["listings"],
+                bids_per_listing=options["bids_per_listing"],
+                comments_per_listing=options["comments_per_listing"],
+                watchlists_per_user=options["watchlists_per_user"],
+            )
+            results = benchmark.run(iterations=options["iterations"])
+
+        self.stdout.write(f"{'route':<16}{'p50 ms':>10}{'p95 ms':>10}{'queries':>10}{'budget':>10}")
+        for result in results:
+            over = result["budget"] is not None and result["queries"] > result["budget"]
+            line = (
+                f"{result['route']:<16}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+                f"{result['queries']:>10}{result['budget'] if result['budget'] is not None else '-':>10}"
+            )
+            self.stdout.write(self.style.ERROR(line) if over else line)
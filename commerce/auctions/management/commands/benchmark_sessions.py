@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+
+from auctions import benchmark
+from auctions.seed import seed
+
+ROUTES = [
+    benchmark.Route("categories", lambda fx: ("get", reverse("categories"), None)),
+    benchmark.Route("create_listing", lambda fx: ("get", reverse("create_listing"), None)),
+]
+
+CONFIGURATIONS = [
+    ("database sessions", {
+        "SESSION_ENGINE": "django.contrib.sessions.backends.db",
+        "AUTHENTICATION_BACKENDS": ["django.contrib.auth.backends.ModelBackend"],
+    }),
+    ("cached sessions", {}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database and compare the queries and latency of "
+        "signed-in page views with database sessions and uncached users against "
+        "the cached configuration in settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=200, help="Timed requests per route.")
+
+    def handle(self, *args, **options):
+        with benchmark.throwaway_database():
+            seed(users=20, listings=200)
+            results = []
+            for name, overrides in CONFIGURATIONS:
+                cache.clear()
+                with override_settings(**overrides):
+                    for result in benchmark.run(iterations=options["iterations"], routes=ROUTES):
+                        results.append((name, result))
+
+        self.stdout.write(f"{'configuration':<20}{'route':<16}{'queries':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for name, result in results:
+            self.stdout.write(
+                f"{name:<20}{result['route']:<16}{result['queries']:>8}{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}"
+            )
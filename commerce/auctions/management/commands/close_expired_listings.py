@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.closing import close_expired_listings
+
+
+class Command(BaseCommand):
+    help = "Close every listing whose end time has passed and record its winner."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Listings closed per UPDATE.")
+        parser.add_argument("--loop", action="store_true", help="Keep running, closing listings as they expire.")
+        parser.add_argument("--interval", type=float, default=30, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            closed = close_expired_listings(batch_size=options["batch_size"])
+            if closed or not options["loop"]:
+                self.stdout.write(f"Closed {closed} expired listings in {time.perf_counter() - start:.2f}s.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
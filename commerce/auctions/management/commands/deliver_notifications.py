@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.notifications import drain, get_sink
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbid and auction-won notifications through the configured sink."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Outbox events read and delivered at a time.")
+        parser.add_argument("--loop", action="store_true", help="Keep running, delivering notifications as they are queued.")
+        parser.add_argument("--interval", type=float, default=1, help="Seconds between passes with --loop.")
+
+    def handle(self, *args, **options):
+        sink = get_sink()
+        while True:
+            result = drain(sink, batch_size=options["batch_size"])
+            if result["events"] or not options["loop"]:
+                rate = result["events"] / result["seconds"] if result["seconds"] else 0
+                self.stdout.write(
+                    f"Delivered {result['notifications']} notifications from {result['events']} events "
+                    f"in {result['seconds']:.2f}s ({rate:.0f} events/sec), backlog {result['backlog']}."
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
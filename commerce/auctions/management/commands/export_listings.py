@@ -0,0 +1,61 @@
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from auctions.models import Listing
+
+FIELDS = [
+    "id", "title", "description", "starting_bid", "current_price", "image_url",
+    "category", "ends_at", "seller", "created_at", "is_active", "closed_at",
+]
+# Columns exported by name rather than as foreign key ids
+RELATED = {"category": F("category__name"), "seller": F("user__username")}
+
+
+class Command(BaseCommand):
+    help = "Stream listings out as CSV or JSON Lines, in the format import_listings reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="File to write, or - for standard output.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--active", action="store_true", help="Only export active listings.")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        file_format = options["format"] or ("csv" if output.endswith(".csv") else "jsonl")
+
+        listings = Listing.objects.order_by("id")
+        if options["active"]:
+            listings = listings.filter(is_active=True)
+        rows = listings.values_list(
+            *(RELATED.get(field, field) for field in FIELDS)
+        ).iterator(chunk_size=options["chunk_size"])
+
+        stream = sys.stdout if output == "-" else open(output, "w", encoding="utf-8", newline="")
+        start = time.perf_counter()
+        exported = 0
+        try:
+            if file_format == "csv":
+                writer = csv.writer(stream)
+                writer.writerow(FIELDS)
+                for row in rows:
+                    writer.writerow(row)
+                    exported += 1
+            else:
+                for row in rows:
+                    stream.write(json.dumps(dict(zip(FIELDS, row)), cls=DjangoJSONEncoder) + "\n")
+                    exported += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - start
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {exported} listings in {elapsed:.1f}s ({exported / elapsed if elapsed else 0:.0f} rows/sec)."
+        ))
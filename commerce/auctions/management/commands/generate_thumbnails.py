@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from auctions.images import make_thumbnails, record_thumbnails
+from auctions.models import Listing
+
+
+class Command(BaseCommand):
+    help = "Make the thumbnails of uploaded listing images that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes making thumbnails.")
+
+    def handle(self, *args, **options):
+        pending = list(
+            Listing.objects.exclude(Q(image="") | Q(image__isnull=True))
+            .filter(Q(thumbnail="") | Q(thumbnail__isnull=True))
+            .values_list("id", "image")
+        )
+        sources = [default_storage.path(image) for _, image in pending]
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            for (listing_id, _), paths in zip(pending, pool.map(make_thumbnails, sources)):
+                record_thumbnails(listing_id, paths)
+        self.stdout.write(self.style.SUCCESS(f"Made thumbnails for {len(pending)} listings."))
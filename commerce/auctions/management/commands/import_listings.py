@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import sys
+import time
+
+from django import forms
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.caching import bump_listing_versions
+from auctions.categories import adjust_active_counts
+from auctions.models import Listing, User
+from auctions.views import ListingForm, load_categories
+
+
+class ImportedListingForm(ListingForm):
+    """
+    ListingForm plus the columns export_listings writes for closed
+    listings, which keep their status, close time and final price. Only
+    active listings must end in the future. Rows without is_active are
+    imported as active.
+    """
+    current_price = forms.FloatField(min_value=0, required=False)
+    is_active = forms.NullBooleanField(required=False)
+    closed_at = forms.DateTimeField(required=False)
+
+    def clean_ends_at(self):
+        # Checked in clean(), once is_active is known
+        return self.cleaned_data["ends_at"]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("is_active") is False:
+            cleaned_data["closed_at"] = cleaned_data.get("closed_at") or timezone.now()
+        elif "ends_at" in cleaned_data:
+            try:
+                ListingForm.clean_ends_at(self)
+            except forms.ValidationError as error:
+                self.add_error("ends_at", error)
+        return cleaned_data
+
+
+class Command(BaseCommand):
+    help = "Import listings from a CSV or JSON Lines file, validated like the create listing form."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for standard input.")
+        parser.add_argument("--user", required=True, help="Username of the seller who will own the listings.")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Listings inserted per statement.")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}.")
+
+        file_format = options["format"] or ("csv" if options["path"].endswith(".csv") else "jsonl")
+        if options["path"] == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        else:
+            stream = open(options["path"], encoding="utf-8", newline="")
+
+        start = time.perf_counter()
+        imported = rejected = 0
+        batch = []
+        categories = load_categories()
+        with stream:
+            for number, row in self.read_rows(stream, file_format):
+                if row is None:
+                    rejected += 1
+                    continue
+
+                form = ImportedListingForm(data=row, categories=categories)
+                if not form.is_valid():
+                    rejected += 1
+                    errors = "; ".join(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items())
+                    self.stderr.write(f"Row {number}: {errors}")
+                    continue
+
+                batch.append(listing_from_form(form, user))
+                if len(batch) >= options["batch_size"]:
+                    imported += self.insert(batch)
+                    batch = []
+            imported += self.insert(batch)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} listings, rejected {rejected}, in {elapsed:.1f}s "
+            f"({imported / elapsed if elapsed else 0:.0f} rows/sec)."
+        ))
+
+    def read_rows(self, stream, file_format):
+        if file_format == "csv":
+            # Row 1 is the header
+            for number, row in enumerate(csv.DictReader(stream), start=2):
+                yield number, row
+            return
+
+        for number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                self.stderr.write(f"Row {number}: invalid JSON ({error})")
+                yield number, None
+                continue
+            if not isinstance(row, dict):
+                self.stderr.write(f"Row {number}: expected a JSON object")
+                yield number, None
+                continue
+            yield number, row
+
+    def insert(self, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            Listing.objects.bulk_create(batch)
+            adjust_active_counts([listing.category_id for listing in batch if listing.is_active], 1)
+            transaction.on_commit(lambda: bump_listing_versions([]))
+        return len(batch)
+
+
+def listing_from_form(form, user):
+    closed = form.cleaned_data["is_active"] is False
+    return Listing(
+        title=form.cleaned_data["title"],
+        description=form.cleaned_data["description"],
+        starting_bid=form.cleaned_data["starting_bid"],
+        # A closed listing keeps the price it sold for. Bids are not
+        # imported, so an active one starts again from its starting bid.
+        current_price=(
+            form.cleaned_data["current_price"] if closed and form.cleaned_data["current_price"] is not None
+            else form.cleaned_data["starting_bid"]
+        ),
+        image_url=form.cleaned_data["image_url"],
+        category=form.cleaned_data["category"],
+        ends_at=form.cleaned_data["ends_at"],
+        is_active=not closed,
+        closed_at=form.cleaned_data["closed_at"] if closed else None,
+        user=user,
+    )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from auctions.bidding import rebuild_bid_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the bid count and leading bid of every listing from the Bid table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Listings updated per statement.")
+
+    def handle(self, *args, **options):
+        updated = rebuild_bid_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt bid statistics for {updated} listings."))
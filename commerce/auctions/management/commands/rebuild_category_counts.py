@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from auctions.categories import rebuild_active_counts
+
+
+class Command(BaseCommand):
+    help = "Recount the active listings of every category."
+
+    def handle(self, *args, **options):
+        updated = rebuild_active_counts()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt active counts for {updated} categories."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from auctions import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from the active listings."
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The full-text search index is only used on SQLite.")
+        search.install(connection)
+        indexed = search.rebuild(connection)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} active listings."))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.seed import PASSWORD, seed
+
+
+class Command(BaseCommand):
+    help = "Fill the database with generated users, listings, bids, comments and watchlists for load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--listings", type=int, default=1000)
+        parser.add_argument("--bids-per-listing", type=int, default=5)
+        parser.add_argument("--comments-per-listing", type=int, default=3)
+        parser.add_argument("--watchlists-per-user", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows inserted per statement.")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, for repeatable data.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        counts = seed(
+            users=options["users"],
+            listings=options["listings"],
+            bids_per_listing=options["bids_per_listing"],
+            comments_per_listing=options["comments_per_listing"],
+            watchlists_per_user=options["watchlists_per_user"],
+            batch_size=options["batch_size"],
+            random_seed=options["seed"],
+        )
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {summary} in {time.perf_counter() - start:.1f}s. Every password is {PASSWORD!r}."
+        ))
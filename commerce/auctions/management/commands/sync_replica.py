@@ -0,0 +1,37 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite primary database onto the replica file with SQLite's "
+        "online backup, to run the primary/replica setup locally."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Keep copying, every this many seconds.")
+
+    def handle(self, *args, **options):
+        alias = settings.REPLICA_DATABASE
+        if alias not in settings.DATABASES:
+            raise CommandError(f"There is no {alias!r} database configured.")
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite" or connections[alias].vendor != "sqlite":
+            raise CommandError("sync_replica only copies between SQLite databases.")
+
+        while True:
+            start = time.perf_counter()
+            primary.ensure_connection()
+            target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f"Copied the primary to the replica in {(time.perf_counter() - start) * 1000:.0f}ms.")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
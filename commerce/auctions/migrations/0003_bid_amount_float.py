@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0002_listing_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bid',
+            name='amount',
+            field=models.FloatField(),
+        ),
+    ]
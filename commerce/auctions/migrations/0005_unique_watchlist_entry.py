@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:57
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicates(apps, schema_editor):
+    Watchlist = apps.get_model('auctions', 'Watchlist')
+
+    keep = Watchlist.objects.values('user', 'listing').annotate(keep=Min('id')).values('keep')
+    Watchlist.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_listing_bid_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='watchlist',
+            constraint=models.UniqueConstraint(fields=('user', 'listing'), name='unique_watchlist_entry'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def record_winners(apps, schema_editor):
+    Listing = apps.get_model('auctions', 'Listing')
+    Listing.objects.filter(is_active=False).update(winner=F('leading_bidder'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0005_unique_watchlist_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['ends_at'], name='listing_active_ends_at_idx'),
+        ),
+        migrations.RunPython(record_winners, migrations.RunPython.noop),
+    ]
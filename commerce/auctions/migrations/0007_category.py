@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# The categories that used to be hard-coded in views.py
+CATEGORIES = ["Books", "Electronics", "Fashion", "Food", "Furniture", "Gadgets", "Health", "Home", "Property", "Sports", "Toys"]
+
+
+def categories_from_names(apps, schema_editor):
+    Category = apps.get_model('auctions', 'Category')
+    Listing = apps.get_model('auctions', 'Listing')
+
+    names = set(CATEGORIES)
+    names.update(
+        Listing.objects.exclude(category__isnull=True).exclude(category="")
+        .values_list('category', flat=True).distinct()
+    )
+    Category.objects.bulk_create([Category(name=name) for name in sorted(names)])
+
+    Listing.objects.exclude(category__isnull=True).exclude(category="").update(
+        category_ref=Subquery(Category.objects.filter(name=OuterRef('category')).values('pk')[:1])
+    )
+    active = (
+        Listing.objects.filter(category_ref=OuterRef('pk'), is_active=True)
+        .order_by().values('category_ref').annotate(count=Count('pk')).values('count')
+    )
+    Category.objects.update(active_count=Coalesce(Subquery(active), 0))
+
+
+def names_from_categories(apps, schema_editor):
+    Category = apps.get_model('auctions', 'Category')
+    Listing = apps.get_model('auctions', 'Listing')
+    Listing.objects.exclude(category_ref__isnull=True).update(
+        category=Subquery(Category.objects.filter(pk=OuterRef('category_ref')).values('name')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0006_listing_ends_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('active_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='auctions.category'),
+        ),
+        migrations.RunPython(categories_from_names, names_from_categories),
+        migrations.RemoveIndex(
+            model_name='listing',
+            name='listing_active_cat_created_idx',
+        ),
+        migrations.RemoveField(
+            model_name='listing',
+            name='category',
+        ),
+        migrations.RenameField(
+            model_name='listing',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='listing',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='listings', to='auctions.category'),
+        ),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'created_at'], name='listing_active_cat_created_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0007_category'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='image',
+            field=models.ImageField(blank=True, null=True, upload_to='listings/%Y/%m/'),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='thumbnail_webp',
+            field=models.ImageField(blank=True, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_closed_at(apps, schema_editor):
+    # When listings were closed was never recorded; count it from now, so
+    # they are archived once the retention window has passed from here
+    Listing = apps.get_model('auctions', 'Listing')
+    Listing.objects.filter(is_active=False).update(closed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBid',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('amount', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('comment', models.CharField(max_length=200)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedListing',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.CharField(max_length=200)),
+                ('starting_bid', models.FloatField()),
+                ('current_price', models.FloatField()),
+                ('image_url', models.CharField(blank=True, max_length=200, null=True)),
+                ('image', models.ImageField(blank=True, null=True, upload_to='')),
+                ('thumbnail', models.ImageField(blank=True, null=True, upload_to='')),
+                ('thumbnail_webp', models.ImageField(blank=True, null=True, upload_to='')),
+                ('created_at', models.DateTimeField()),
+                ('bid_count', models.IntegerField(default=0)),
+                ('ends_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='listing',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_closed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='listing',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['closed_at'], name='listing_closed_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedbid',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_listings', to='auctions.category'),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedlisting',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_archived_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='auctions.archivedlisting'),
+        ),
+        migrations.AddField(
+            model_name='archivedbid',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', to='auctions.archivedlisting'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(fields=['listing', 'id'], name='archivedcomment_listing_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbid',
+            index=models.Index(fields=['listing', 'id'], name='archivedbid_listing_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0012_bid_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBidSummary',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('max_bid', models.FloatField()),
+                ('is_leading', models.BooleanField(default=False)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auctions.archivedlisting')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bid_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
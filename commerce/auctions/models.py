@@ -5,37 +5,165 @@ from django.db import models
 class User(AbstractUser):
     pass
 
+class Category(models.Model):
+    name = models.CharField(max_length=64, unique=True)
+    active_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
 class Listing(models.Model):
     title = models.CharField(max_length=200)
     description = models.CharField(max_length=200)
     starting_bid = models.FloatField()
     current_price = models.FloatField()
     image_url = models.CharField(max_length=200, null=True, blank=True)
-    category = models.CharField(max_length=200, null=True, blank=True)
+    image = models.ImageField(upload_to="listings/%Y/%m/", null=True, blank=True)
+    thumbnail = models.ImageField(null=True, blank=True)
+    thumbnail_webp = models.ImageField(null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="listings")
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="listings")
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
+    bid_count = models.IntegerField(default=0)
+    leading_bid = models.ForeignKey("Bid", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    leading_bidder = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    ends_at = models.DateTimeField(null=True, blank=True)
+    winner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="won_listings")
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], condition=models.Q(is_active=True), name="listing_active_created_idx"),
+            models.Index(fields=["category", "created_at"], condition=models.Q(is_active=True), name="listing_active_cat_created_idx"),
+            models.Index(fields=["ends_at"], condition=models.Q(is_active=True), name="listing_active_ends_at_idx"),
+            models.Index(fields=["closed_at"], condition=models.Q(is_active=False), name="listing_closed_at_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
 
 class Bid(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE)
-    amount = models.IntegerField()
+    amount = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "id"], name="bid_listing_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"${self.amount} on listing {self.listing_id}"
 
 class Comment(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE)
     comment = models.CharField(max_length=200)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "id"], name="comment_listing_id_idx"),
+        ]
+
+    def __str__(self):
+        return self.comment
+
 class Watchlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "listing"], name="unique_watchlist_entry"),
+        ]
 
+class BidSummary(models.Model):
+    """
+    A user's standing on a listing they bid on, kept up to date by
+    place_bid and close_listings, so the My Bids page reads one user's rows
+    instead of grouping the Bid table.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="bid_summaries")
+    listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="+")
+    max_bid = models.FloatField()
+    is_leading = models.BooleanField(default=False)
+    is_closed = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "listing"], name="unique_bid_summary"),
+        ]
 
+class OutboxEvent(models.Model):
+    """
+    A notification waiting for the deliver_notifications worker, written
+    in the same transaction as the bid or close that caused it.
+    """
+    OUTBID = "outbid"
+    WON = "won"
+    KINDS = [(OUTBID, "Outbid"), (WON, "Won")]
 
+    kind = models.CharField(max_length=16, choices=KINDS)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    # Not a foreign key: the listing may be archived before delivery
+    listing_id = models.IntegerField()
+    amount = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
-    
+# Closed listings older than ARCHIVE_AFTER_DAYS are moved here with their
+# bids and comments by auctions.archive, keeping their ids, so the tables
+# above only hold the live auctions and the recently closed ones.
 
-    
+class ArchivedListing(models.Model):
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    description = models.CharField(max_length=200)
+    starting_bid = models.FloatField()
+    current_price = models.FloatField()
+    image_url = models.CharField(max_length=200, null=True, blank=True)
+    image = models.ImageField(null=True, blank=True)
+    thumbnail = models.ImageField(null=True, blank=True)
+    thumbnail_webp = models.ImageField(null=True, blank=True)
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name="archived_listings")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_listings")
+    created_at = models.DateTimeField()
+    bid_count = models.IntegerField(default=0)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    winner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="won_archived_listings")
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    # Only closed listings are archived
+    is_active = False
+
+class ArchivedBid(models.Model):
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    listing = models.ForeignKey(ArchivedListing, on_delete=models.CASCADE, related_name="bids")
+    amount = models.FloatField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "id"], name="archivedbid_listing_id_idx"),
+        ]
+
+class ArchivedBidSummary(models.Model):
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_bid_summaries")
+    listing = models.ForeignKey(ArchivedListing, on_delete=models.CASCADE, related_name="+")
+    max_bid = models.FloatField()
+    is_leading = models.BooleanField(default=False)
+
+    # Only closed listings are archived
+    is_closed = True
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    listing = models.ForeignKey(ArchivedListing, on_delete=models.CASCADE, related_name="comments")
+    comment = models.CharField(max_length=200)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["listing", "id"], name="archivedcomment_listing_id_idx"),
+        ]
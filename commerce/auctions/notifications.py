@@ -0,0 +1,102 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    """Deliver notifications as log lines; a stand-in for email or push."""
+
+    def deliver(self, notifications):
+        for notification in notifications:
+            logger.info(
+                "%s: user %s, listing %s, $%s (%s events)",
+                notification["kind"], notification["user_id"], notification["listing_id"],
+                notification["amount"], notification["events"],
+            )
+
+
+class FileSink:
+    """Append notifications to a file as JSON lines."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def deliver(self, notifications):
+        with open(self.path, "a") as file:
+            for notification in notifications:
+                file.write(json.dumps(notification, cls=DjangoJSONEncoder) + "\n")
+
+
+def get_sink():
+    """The sink configured by NOTIFICATION_SINK, a dict of BACKEND and OPTIONS."""
+    config = settings.NOTIFICATION_SINK
+    return import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+
+
+def coalesce(events):
+    """
+    Merge events for the same user, listing and kind, such as a user being
+    outbid five times on one listing, into one notification carrying the
+    latest amount.
+    """
+    notifications = {}
+    for event in events:
+        key = (event["kind"], event["user_id"], event["listing_id"])
+        notification = notifications.get(key)
+        if notification is None:
+            notifications[key] = dict(event, events=1)
+        else:
+            notification.update(amount=event["amount"], created_at=event["created_at"], events=notification["events"] + 1)
+    return list(notifications.values())
+
+
+def deliver_batch(sink, batch_size=500):
+    """
+    Deliver the oldest batch_size outbox events through sink and delete them.
+    Returns (events, notifications) delivered.
+
+    Delivery happens outside any transaction, so a slow sink never holds up
+    bids. If it raises, the events stay queued and are delivered again on
+    the next pass: delivery is at least once. Run a single worker.
+    """
+    events = list(
+        OutboxEvent.objects.order_by("id")
+        .values("id", "kind", "user_id", "listing_id", "amount", "created_at")[:batch_size]
+    )
+    if not events:
+        return 0, 0
+
+    ids = [event.pop("id") for event in events]
+    notifications = coalesce(events)
+    sink.deliver(notifications)
+    OutboxEvent.objects.filter(id__in=ids).delete()
+    return len(events), len(notifications)
+
+
+def drain(sink, batch_size=500):
+    """
+    Deliver batches until the outbox is empty. Returns the events and
+    notifications delivered, the seconds taken and the backlog left behind.
+    """
+    start = time.perf_counter()
+    total_events = total_notifications = 0
+    while True:
+        events, notifications = deliver_batch(sink, batch_size)
+        total_events += events
+        total_notifications += notifications
+        if events < batch_size:
+            break
+    return {
+        "events": total_events,
+        "notifications": total_notifications,
+        "seconds": time.perf_counter() - start,
+        "backlog": OutboxEvent.objects.count(),
+    }
@@ -0,0 +1,121 @@
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE = "use_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+# Models whose rows are cached once read. A row read from a lagging replica
+# would stay cached after the replica caught up: a deleted session, or a user
+# with the password they just changed away from.
+PRIMARY_MODELS = {"sessions.session", settings.AUTH_USER_MODEL.lower()}
+
+
+class RoutingState:
+    __slots__ = ("pinned", "wrote", "read_replica")
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+        self.read_replica = False
+
+
+# The routing state of the request being handled; None outside requests
+_state = contextvars.ContextVar("replica_routing", default=None)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the REPLICA_DATABASE alias and everything else to the
+    primary. Reads stay on the primary outside requests (management
+    commands), inside transactions on the primary, during unsafe requests
+    and for REPLICA_STICKY_SECONDS after a request that wrote, so that users
+    always see their own writes however far the replica lags. Sessions and
+    users are always read from the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is None or state.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or model._meta.label_lower in PRIMARY_MODELS
+        ):
+            return DEFAULT_DB_ALIAS
+        state.read_replica = True
+        return settings.REPLICA_DATABASE
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinningMiddleware:
+    """
+    Track the routing state of each request for PrimaryReplicaRouter, and
+    set a short-lived cookie after a request that wrote, which pins that
+    browser's following requests to the primary. A page read from the
+    replica loses its ETag and Last-Modified, which name the current
+    version of the page even though the replica may not have caught up
+    with it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(request, response, state)
+
+    def start(self, request):
+        return RoutingState(pinned=request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES)
+
+    def finish(self, request, response, state):
+        if state.read_replica:
+            for header in ("ETag", "Last-Modified"):
+                if response.has_header(header):
+                    del response[header]
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite="Lax",
+            )
+        return response
+
+
+def read_from_replica():
+    """Whether the request being handled has read anything from the replica."""
+    state = _state.get()
+    return state is not None and state.read_replica
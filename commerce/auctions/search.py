@@ -0,0 +1,96 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Listing
+
+FTS_TABLE = "auctions_listing_fts"
+
+# An external-content FTS5 index over active listings. Triggers keep it in
+# step with auctions_listing, so creating, editing or closing a listing only
+# touches that listing's index entries. Everything is IF NOT EXISTS because
+# it is (re)installed after every migrate: SQLite migrations that rebuild
+# auctions_listing drop its triggers.
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='auctions_listing', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON auctions_listing
+    WHEN new.is_active BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON auctions_listing
+    WHEN old.is_active BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, description, is_active ON auctions_listing
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+            SELECT 'delete', old.id, old.title, old.description WHERE old.is_active;
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+            SELECT new.id, new.title, new.description WHERE new.is_active;
+    END
+    """,
+]
+
+
+def install(using_connection):
+    """Create the search index and its triggers, filling the index if it is new."""
+    created = FTS_TABLE not in using_connection.introspection.table_names()
+    with using_connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+    if created:
+        rebuild(using_connection)
+
+
+def rebuild(using_connection=connection):
+    """Repopulate the search index from active listings in one pass."""
+    with transaction.atomic(using=using_connection.alias), using_connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, description) "
+            f"SELECT id, title, description FROM auctions_listing WHERE is_active"
+        )
+        indexed = cursor.rowcount
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return indexed
+
+
+def search_listings(query, limit=20, offset=0):
+    """
+    Return active listings matching every word of query, best match first.
+    Each word also matches as a prefix, so results appear while typing.
+    """
+    terms = re.findall(r"\w+", query)[:10]
+    if not terms:
+        return []
+
+    if connection.vendor != "sqlite":
+        matches = Listing.objects.filter(is_active=True)
+        for term in terms:
+            matches = matches.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return list(matches.order_by("-created_at", "-id")[offset:offset + limit])
+
+    expression = " ".join(f'"{term}"*' for term in terms)
+    with connection.cursor() as cursor:
+        # Rank with title matches weighted well above description matches
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s OFFSET %s",
+            [expression, limit, offset],
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+
+    listings = Listing.objects.filter(is_active=True).in_bulk(ids)
+    return [listings[id] for id in ids if id in listings]
@@ -0,0 +1,91 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .bidding import rebuild_bid_stats, rebuild_bid_summaries
+from .categories import rebuild_active_counts
+from .models import User, Category, Listing, Bid, Comment, Watchlist
+
+PASSWORD = "password"
+
+
+def seed(users=100, listings=1000, bids_per_listing=5, comments_per_listing=3, watchlists_per_user=10,
+         batch_size=1000, random_seed=0):
+    """
+    Fill the database with generated users, listings, bids, comments and
+    watchlist entries, all through bulk inserts. Every user's password is
+    PASSWORD. Listings are generated batch_size at a time so memory stays
+    flat however many are requested. Returns the number of rows created per
+    model.
+    """
+    rng = random.Random(random_seed)
+    counts = {"users": 0, "listings": 0, "bids": 0, "comments": 0, "watchlists": 0}
+
+    # Hashing is deliberately slow, so every user shares one hash
+    password = make_password(PASSWORD)
+    first_user = User.objects.order_by("-id").values_list("id", flat=True).first() or 0
+    with transaction.atomic():
+        created = User.objects.bulk_create(
+            (User(username=f"user{first_user + i + 1}", email=f"user{first_user + i + 1}@example.com", password=password)
+             for i in range(users)),
+            batch_size=batch_size,
+        )
+    user_ids = [user.id for user in created]
+    counts["users"] = len(user_ids)
+
+    category_ids = list(Category.objects.values_list("id", flat=True)) + [None]
+    listing_ids = []
+    for start in range(0, listings, batch_size):
+        count = min(batch_size, listings - start)
+        with transaction.atomic():
+            batch_listings = []
+            batch_bids = []
+            for i in range(count):
+                starting_bid = rng.randint(1, 500)
+                amounts = []
+                for _ in range(bids_per_listing):
+                    amounts.append(amounts[-1] + rng.randint(1, 20) if amounts else starting_bid)
+                batch_listings.append(Listing(
+                    title=f"Listing {start + i + 1}",
+                    description=f"A generated listing for load testing, number {start + i + 1}.",
+                    starting_bid=starting_bid,
+                    current_price=amounts[-1] if amounts else starting_bid,
+                    category_id=rng.choice(category_ids),
+                    user_id=rng.choice(user_ids),
+                ))
+                batch_bids.append(amounts)
+            Listing.objects.bulk_create(batch_listings)
+
+            bids = [
+                Bid(listing=listing, user_id=rng.choice(user_ids), amount=amount)
+                for listing, amounts in zip(batch_listings, batch_bids)
+                for amount in amounts
+            ]
+            Bid.objects.bulk_create(bids)
+            comments = [
+                Comment(listing=listing, user_id=rng.choice(user_ids), comment=f"Generated comment {n + 1}")
+                for listing in batch_listings
+                for n in range(comments_per_listing)
+            ]
+            Comment.objects.bulk_create(comments)
+
+        listing_ids.extend(listing.id for listing in batch_listings)
+        counts["listings"] += len(batch_listings)
+        counts["bids"] += len(bids)
+        counts["comments"] += len(comments)
+
+    watchlists = []
+    for user_id in user_ids:
+        for listing_id in rng.sample(listing_ids, min(watchlists_per_user, len(listing_ids))):
+            watchlists.append(Watchlist(user_id=user_id, listing_id=listing_id))
+        if len(watchlists) >= batch_size:
+            counts["watchlists"] += len(Watchlist.objects.bulk_create(watchlists))
+            watchlists = []
+    counts["watchlists"] += len(Watchlist.objects.bulk_create(watchlists))
+
+    if listing_ids:
+        rebuild_bid_stats(batch_size=batch_size, listings=Listing.objects.filter(pk__gte=listing_ids[0]))
+        rebuild_active_counts()
+        rebuild_bid_summaries(batch_size=batch_size)
+    return counts
@@ -0,0 +1,165 @@
+import gzip
+import mimetypes
+import os
+import posixpath
+from urllib.parse import unquote
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".map", ".svg", ".json", ".txt", ".html", ".xml"}
+
+# Hashed names change whenever their content does, so browsers may keep them
+# for good. Anything else requested by its plain name is kept briefly.
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CACHE_CONTROL = "public, max-age=60"
+
+# Content-Encoding of each precompressed variant, in order of preference
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes a gzip variant, and a brotli
+    one when the brotli package is installed, of each text file collectstatic
+    copies, so StaticFilesMiddleware never compresses on a request.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in set(paths) | set(self.hashed_files.values()):
+            if os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, "rb") as source:
+            content = source.read()
+        variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", brotli.compress(content)))
+        for suffix, compressed in variants:
+            # Not worth a Content-Encoding for less than 5% saved
+            if len(compressed) < len(content) * 0.95:
+                with open(path + suffix, "wb") as variant:
+                    variant.write(compressed)
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected files from STATIC_ROOT, choosing the precompressed
+    variant the browser accepts, with far-future immutable caching for
+    manifest-hashed names. Requests for anything else pass through.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # Whether to look for the .br and .gz variants collectstatic writes
+    precompressed = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        url = self.url()
+        self.prefix = url if url.startswith("/") else "/" + url
+        # Loaded once: collectstatic runs before the server (re)starts
+        self.hashed_names = set(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+    def url(self):
+        return settings.STATIC_URL
+
+    def root(self):
+        return settings.STATIC_ROOT
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve(request) or await self.get_response(request)
+
+    def serve(self, request):
+        if request.method not in ("GET", "HEAD") or not request.path.startswith(self.prefix):
+            return None
+        root = self.root()
+        if not root:
+            return None
+        name = posixpath.normpath(unquote(request.path[len(self.prefix):])).lstrip("/")
+        try:
+            path = safe_join(root, name)
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", "")) if self.precompressed else ()
+            for encoding, suffix in ENCODINGS:
+                if encoding in accepted and os.path.isfile(path + suffix):
+                    response = FileResponse(open(path + suffix, "rb"), content_type=content_type)
+                    response["Content-Encoding"] = encoding
+                    break
+            else:
+                response = FileResponse(open(path, "rb"), content_type=content_type)
+            response["Last-Modified"] = http_date(stat.st_mtime)
+
+        if self.precompressed and os.path.splitext(name)[1] in COMPRESSIBLE_EXTENSIONS:
+            response["Vary"] = "Accept-Encoding"
+        response["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if name in self.hashed_names else CACHE_CONTROL
+        return response
+
+
+class MediaFilesMiddleware(StaticFilesMiddleware):
+    """
+    Serve uploaded files and their thumbnails from MEDIA_ROOT, for
+    deployments with no front server in front of the app to do it. Uploads
+    have no precompressed variants and no hashed names.
+    """
+
+    precompressed = False
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.hashed_names = set()
+
+    def url(self):
+        return settings.MEDIA_URL
+
+    def root(self):
+        return settings.MEDIA_ROOT
+
+
+def accepted_encodings(header):
+    """The content codings an Accept-Encoding header allows, ignoring q=0."""
+    accepted = set()
+    for coding in header.split(","):
+        coding, *params = [part.strip() for part in coding.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
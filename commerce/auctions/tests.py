@@ -1,3 +1,1094 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+import re
+import types
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import admin, async_views, backends, benchmark, bidding, caching, instrumentation, live, notifications, routers, search, urls
+from .archive import archive_closed_listings, archive_listings
+from .categories import rebuild_active_counts
+from .closing import close_expired_listings, close_listings
+from .models import User, Category, Listing, Bid, BidSummary, Comment, Watchlist, ArchivedListing, ArchivedBid, OutboxEvent
+from .pagination import paginate
+from .search import search_listings
+from .seed import seed
+
+
+class PlaceBidTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", password="password")
+        self.bidder = User.objects.create_user("bidder", password="password")
+        self.listing = Listing.objects.create(
+            title="Lamp", description="A lamp", starting_bid=10, current_price=10, user=self.seller
+        )
+
+    def test_first_bid_may_match_starting_bid(self):
+        bidding.place_bid(self.bidder, self.listing.id, 10)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, 10)
+
+    def test_first_bid_below_starting_bid_is_refused(self):
+        with self.assertRaisesMessage(bidding.BidError, "at least the starting bid"):
+            bidding.place_bid(self.bidder, self.listing.id, 9.5)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_later_bids_must_beat_current_price(self):
+        bidding.place_bid(self.bidder, self.listing.id, 12.5)
+        with self.assertRaisesMessage(bidding.BidError, "greater than the current price"):
+            bidding.place_bid(self.seller, self.listing.id, 12.5)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, 12.5)
+        self.assertEqual(Bid.objects.get().amount, 12.5)
+
+    def test_bid_updates_denormalized_stats(self):
+        bidding.place_bid(self.seller, self.listing.id, 11)
+        bid = bidding.place_bid(self.bidder, self.listing.id, 12)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.bid_count, 2)
+        self.assertEqual(self.listing.leading_bid, bid)
+        self.assertEqual(self.listing.leading_bidder, self.bidder)
+
+    def test_rebuild_bid_stats(self):
+        Bid.objects.create(user=self.seller, listing=self.listing, amount=11)
+        bid = Bid.objects.create(user=self.bidder, listing=self.listing, amount=15)
+        Bid.objects.create(user=self.seller, listing=self.listing, amount=15)
+        self.assertEqual(bidding.rebuild_bid_stats(batch_size=1), 1)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.bid_count, 3)
+        self.assertEqual(self.listing.leading_bid, bid)
+        self.assertEqual(self.listing.leading_bidder, self.bidder)
+
+    def test_closed_listing_is_refused(self):
+        Listing.objects.filter(pk=self.listing.id).update(is_active=False)
+        with self.assertRaises(bidding.BidError):
+            bidding.place_bid(self.bidder, self.listing.id, 100)
+
+    def test_locked_database_asks_the_bidder_to_try_again(self):
+        self.client.force_login(self.bidder)
+        with patch.object(bidding, "place_bid", side_effect=OperationalError("database is locked")):
+            response = self.client.post(
+                reverse("place_bid", args=[self.listing.id]), {"bid": 20},
+                HTTP_REFERER=reverse("listings", args=[self.listing.id]), follow=True,
+            )
+        self.assertContains(response, "please try again")
+
+
+class BidStressTest(TransactionTestCase):
+    def test_concurrent_bids_leave_consistent_state(self):
+        # A correctness check; manage.py benchmark_bids measures throughput
+        users = [User.objects.create_user(f"bidder{i}", password="password") for i in range(8)]
+        listing = Listing.objects.create(
+            title="Watch", description="A watch", starting_bid=1, current_price=1, user=users[0]
+        )
+        result = benchmark.compete(listing.id, users, bids_per_user=250)
+
+        self.assertEqual(result["errors"], [])
+        listing.refresh_from_db()
+        amounts = list(Bid.objects.filter(listing=listing).order_by("id").values_list("amount", flat=True))
+        self.assertEqual(len(amounts), len(result["accepted"]))
+        self.assertEqual(amounts, sorted(set(amounts)))
+        self.assertEqual(listing.current_price, max(amounts))
+        self.assertEqual(listing.current_price, max(result["accepted"]))
+        self.assertEqual(listing.bid_count, len(amounts))
+        self.assertEqual(listing.leading_bid.amount, listing.current_price)
+        # My Bids is recorded under each bid's write lock
+        leaders = BidSummary.objects.filter(listing=listing, is_leading=True).values_list("user", flat=True)
+        self.assertEqual(list(leaders), [listing.leading_bidder_id])
+
+    def test_locked_database_is_retried(self):
+        user = User.objects.create_user("bidder", password="password")
+        listing = Listing.objects.create(title="Watch", description="A watch", starting_bid=1, current_price=1, user=user)
+        apply_bid = bidding._apply_bid
+        calls = []
+
+        def locked_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return apply_bid(*args)
+
+        with patch.object(bidding, "_apply_bid", locked_once), patch.object(bidding.time, "sleep"):
+            bidding.place_bid(user, listing.id, 5)
+        self.assertEqual(len(calls), 2)
+        listing.refresh_from_db()
+        self.assertEqual(listing.current_price, 5)
+
+
+class WatchlistTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("watcher", password="password")
+        self.client.force_login(self.user)
+
+    def create_listings(self, count):
+        return Listing.objects.bulk_create(
+            Listing(title=f"Item {i}", description="An item", starting_bid=1, current_price=1, user=self.user)
+            for i in range(count)
+        )
+
+    def test_toggle_adds_then_removes(self):
+        listing = self.create_listings(1)[0]
+        self.client.get(reverse("to_watchlist", args=[listing.id]))
+        self.assertEqual(Watchlist.objects.filter(user=self.user, listing=listing).count(), 1)
+        self.client.get(reverse("to_watchlist", args=[listing.id]))
+        self.assertFalse(Watchlist.objects.filter(user=self.user, listing=listing).exists())
+
+    def test_toggle_keeps_cached_count_in_step(self):
+        listing = self.create_listings(1)[0]
+        self.client.get(reverse("watchlist"))
+        self.client.get(reverse("to_watchlist", args=[listing.id]))
+        response = self.client.get(reverse("watchlist"))
+        self.assertEqual(response.context["watchlist_count"], 1)
+
+    def test_watchlist_page_query_count_does_not_grow(self):
+        for listing in self.create_listings(1) + self.create_listings(20):
+            Watchlist.objects.create(user=self.user, listing=listing)
+            self.client.get(reverse("watchlist"))
+            # Only the joined watchlist rows: the session and user come from
+            # the cache, which saves the two queries loading them would add
+            with self.assertNumQueries(1):
+                self.client.get(reverse("watchlist"))
+
+
+class LiveFanOutTests(SimpleTestCase):
+    # manage.py benchmark_live measures latency with thousands of streams
+    def test_every_subscriber_receives_every_update(self):
+        broker = live.Broker()
+        latencies = asyncio.run(benchmark.fan_out(broker, subscribers=50, updates=5))
+        self.assertEqual(len(latencies), 50 * 5)
+        self.assertEqual(broker.subscriber_count(1), 0)
+
+    def test_slow_subscribers_skip_to_the_latest_update(self):
+        async def run():
+            broker = live.Broker()
+            queue = broker.subscribe(1)
+            for price in (1, 2, 3):
+                broker.publish(1, {"price": price})
+            await asyncio.sleep(0)
+            self.assertEqual(broker.subscriber_count(1), 1)
+            self.assertEqual(queue.qsize(), 1)
+            self.assertEqual(await queue.get(), {"price": 3})
+            broker.unsubscribe(1, queue)
+            self.assertEqual(broker.subscriber_count(1), 0)
+
+        asyncio.run(run())
+
+
+class CloseExpiredListingsTests(TestCase):
+    def test_closes_expired_listings_and_records_winners(self):
+        seller = User.objects.create_user("seller", password="password")
+        bidder = User.objects.create_user("bidder", password="password")
+        now = timezone.now()
+        expired, running = Listing.objects.bulk_create([
+            Listing(title="Old", description="d", starting_bid=1, current_price=1, user=seller, ends_at=now + timedelta(minutes=1)),
+            Listing(title="New", description="d", starting_bid=1, current_price=1, user=seller, ends_at=now + timedelta(hours=1)),
+        ])
+        bidding.place_bid(bidder, expired.id, 2)
+
+        self.assertEqual(close_expired_listings(now=now + timedelta(minutes=2), batch_size=1), 1)
+
+        expired.refresh_from_db()
+        running.refresh_from_db()
+        self.assertFalse(expired.is_active)
+        self.assertEqual(expired.winner, bidder)
+        self.assertTrue(running.is_active)
+        self.assertIsNone(running.winner)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed(users=5, listings=30, bids_per_listing=3, comments_per_listing=3, watchlists_per_user=5)
+
+    def test_every_route_has_a_budget(self):
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names - set(benchmark.QUERY_BUDGETS), set())
+        self.assertEqual(names - {route.name for route in benchmark.ROUTES}, set())
+
+    def test_routes_stay_within_budget(self):
+        results = benchmark.run(iterations=2, warmup=1)
+        for result in results:
+            with self.subTest(route=result["route"]):
+                self.assertLessEqual(result["queries"], result["budget"])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        instrumentation.registry.reset()
+        self.user = User.objects.create_user("seller", password="secret")
+        self.listing = Listing.objects.create(
+            title="Lamp", description="A lamp", starting_bid=10, current_price=10, user=self.user
+        )
+        self.client.force_login(self.user)
+
+    def test_server_timing_counts_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("listings", args=[self.listing.id]))
+        self.assertIn(f'db;desc="{len(queries)} queries"', response["Server-Timing"])
+        self.assertRegex(response["Server-Timing"], r"tpl;dur=\d+\.\d+")
+        self.assertRegex(response["Server-Timing"], r"request;dur=\d+\.\d+")
+
+    def test_metrics_aggregate_by_route(self):
+        for _ in range(3):
+            self.client.get(reverse("index"))
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('auctions_request_duration_seconds_count{route="index"} 3', body)
+        self.assertIn('auctions_request_queries_bucket{route="index",le="+Inf"} 3', body)
+
+
+class CategoryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller", password="secret")
+        self.books = Category.objects.create(name="Rare books")
+        self.client.force_login(self.user)
+
+    def create(self, **data):
+        return self.client.post(reverse("create_listing"), {
+            "title": "Atlas", "description": "An old atlas", "starting_bid": 5, **data,
+        })
+
+    def test_create_and_close_maintain_active_count(self):
+        self.create(category="Rare books")
+        self.create(category="Rare books")
+        self.create()
+        self.books.refresh_from_db()
+        self.assertEqual(self.books.active_count, 2)
+
+        close_listings(Listing.objects.filter(pk=Listing.objects.filter(category=self.books).first().pk))
+        self.books.refresh_from_db()
+        self.assertEqual(self.books.active_count, 1)
+
+        Category.objects.update(active_count=0)
+        rebuild_active_counts()
+        self.books.refresh_from_db()
+        self.assertEqual(self.books.active_count, 1)
+
+    def test_categories_page_is_one_query(self):
+        self.client.logout()
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("categories"))
+        self.assertContains(response, "Rare books")
+
+
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        self.user = User.objects.create_user("seller", password="secret")
+        self.client.force_login(self.user)
+
+    def test_upload_gets_fixed_size_thumbnails(self):
+        upload = io.BytesIO()
+        Image.new("RGB", (1600, 1200), "teal").save(upload, "JPEG")
+        with self.settings(MEDIA_ROOT=self.media, IMAGE_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("create_listing"), {
+                "title": "Vase", "description": "A vase", "starting_bid": 5,
+                "image": SimpleUploadedFile("vase.jpg", upload.getvalue(), content_type="image/jpeg"),
+            })
+
+        listing = Listing.objects.get(title="Vase")
+        with self.settings(MEDIA_ROOT=self.media):
+            for variant in (listing.thumbnail, listing.thumbnail_webp):
+                with Image.open(variant.path) as image:
+                    self.assertEqual(image.size, (300, 200))
+            self.assertContains(self.client.get(reverse("index")), 'width="300" height="200"')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user("seller", password="secret")
+        self.bidder = User.objects.create_user("bidder", password="secret")
+        self.listing = Listing.objects.create(
+            title="Lamp", description="A lamp", starting_bid=10, current_price=10, user=self.seller
+        )
+        self.url = reverse("listings", args=[self.listing.id])
+
+    def test_anonymous_pages_are_cached_until_a_bid(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).content, first.content)
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bidding.place_bid(self.bidder, self.listing.id, 15)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "15.0")
+
+    def test_etag_differs_per_user_and_skips_pending_messages(self):
+        index = reverse("index")
+        anonymous = self.client.get(index)["ETag"]
+        self.client.force_login(self.bidder)
+        signed_in = self.client.get(index)
+        self.assertNotEqual(signed_in["ETag"], anonymous)
+
+        self.client.post(reverse("place_bid", args=[self.listing.id]), {"bid": 1})
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=signed_in["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("ETag"))
+        response = self.client.get(self.url)
+        self.assertContains(response, "Bid amount must be at least the starting bid!")
+
+    def test_signed_in_listing_pages_stay_valid_after_signing_in_again(self):
+        client = Client(enforce_csrf_checks=True)
+        client.get(reverse("login"))
+        client.post(reverse("login"), {
+            "username": "bidder", "password": "secret", "csrfmiddlewaretoken": client.cookies["csrftoken"].value,
+        })
+        before = client.get(self.url)
+        self.assertFalse(before.has_header("ETag"))
+        self.assertFalse(before.has_header("Last-Modified"))
+
+        client.get(reverse("logout"))
+        client.get(reverse("login"))
+        client.post(reverse("login"), {
+            "username": "bidder", "password": "secret", "csrfmiddlewaretoken": client.cookies["csrftoken"].value,
+        })
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=f'"{caching.listing_version(self.listing.id)}"')
+        self.assertEqual(response.status_code, 200)
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        bid = client.post(reverse("place_bid", args=[self.listing.id]), {"bid": 20, "csrfmiddlewaretoken": token})
+        self.assertEqual(bid.status_code, 302)
+        self.assertEqual(Listing.objects.get(pk=self.listing.id).current_price, 20)
+
+
+async_urls = types.ModuleType("async_urls")
+async_urls.urlpatterns = urls.build_urlpatterns(async_views)
+
+
+@override_settings(ROOT_URLCONF=async_urls)
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("bidder", password="secret")
+        self.category = Category.objects.create(name="Lighting", active_count=1)
+        self.listing = Listing.objects.create(
+            title="Lamp", description="A lamp", starting_bid=10, current_price=10, user=self.user, category=self.category
+        )
+        Watchlist.objects.create(user=self.user, listing=self.listing)
+        self.listing.comment_set.create(user=self.user, comment="Still for sale?")
+        self.client.force_login(self.user)
+
+    def test_read_pages(self):
+        self.assertContains(self.client.get(reverse("index")), "Lamp")
+        self.assertContains(self.client.get(reverse("categories")), "Lighting")
+        self.assertContains(self.client.get(reverse("watchlist")), "Lamp")
+
+        response = self.client.get(reverse("listings", args=[self.listing.id]))
+        self.assertContains(response, "Remove from watchlist")
+        self.assertContains(response, "Still for sale?")
+        self.assertContains(response, 'Watchlist <span class="badge text-bg-secondary">1</span>', html=False)
+
+    def test_missing_listing_is_404(self):
+        self.assertEqual(self.client.get(reverse("listings", args=[self.listing.id + 1])).status_code, 404)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def handle(self, request, writes=False):
+        """Run request through the middleware, returning the response and the database reads went to."""
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Listing))
+            if writes:
+                self.router.db_for_write(Listing)
+            return HttpResponse()
+
+        response = routers.PrimaryPinningMiddleware(view)(request)
+        return response, reads[0]
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Listing), "default")
+        self.assertEqual(self.router.db_for_write(Listing), "default")
+
+    def test_safe_requests_read_from_the_replica(self):
+        response, db = self.handle(self.factory.get("/"))
+        self.assertEqual(db, "replica")
+        self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+
+    def test_writes_pin_the_browser_to_the_primary(self):
+        response, db = self.handle(self.factory.post("/place_bid/1"))
+        self.assertEqual(db, "default")
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+        # GET views that write, like to_watchlist, pin too
+        response, db = self.handle(self.factory.get("/to_watchlist/1"), writes=True)
+        self.assertEqual(db, "replica")
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+        request = self.factory.get("/watchlist")
+        request.COOKIES[routers.STICKY_COOKIE] = "1"
+        self.assertEqual(self.handle(request)[1], "default")
+
+    def test_sessions_and_users_are_read_from_the_primary(self):
+        def view(request):
+            return HttpResponse(self.router.db_for_read(User))
+
+        self.assertEqual(routers.PrimaryPinningMiddleware(view)(self.factory.get("/")).content, b"default")
+
+    def test_pages_read_from_the_replica_lose_their_validators(self):
+        def view(request):
+            self.router.db_for_read(Listing)
+            self.assertTrue(routers.read_from_replica())
+            response = HttpResponse()
+            response["ETag"] = '"1"'
+            response["Last-Modified"] = "Sun, 18 Oct 2026 20:00:00 GMT"
+            return response
+
+        response = routers.PrimaryPinningMiddleware(view)(self.factory.get("/"))
+        self.assertFalse(response.has_header("ETag"))
+        self.assertFalse(response.has_header("Last-Modified"))
+
+
+class SessionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("bidder", password="secret")
+        self.client.login(username="bidder", password="secret")
+
+    def test_signed_in_page_view_only_queries_its_own_data(self):
+        self.client.get(reverse("categories"))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("categories"))
+        self.assertContains(response, "Signed in as <strong>bidder</strong>")
+
+    def test_password_change_and_logout_drop_the_cached_user(self):
+        self.client.get(reverse("categories"))
+        self.assertIsNotNone(cache.get(backends.user_cache_key(self.user.id)))
+
+        self.user.set_password("changed")
+        self.user.save()
+        self.assertIsNone(cache.get(backends.user_cache_key(self.user.id)))
+        # The session was signed with the old password
+        self.assertNotContains(self.client.get(reverse("categories")), "Signed in as")
+
+        self.client.login(username="bidder", password="changed")
+        self.client.get(reverse("categories"))
+        self.client.get(reverse("logout"))
+        self.assertIsNone(cache.get(backends.user_cache_key(self.user.id)))
+
+    def test_sessions_signed_in_with_model_backend_stay_signed_in(self):
+        self.client.force_login(self.user, backend="django.contrib.auth.backends.ModelBackend")
+        self.assertContains(self.client.get(reverse("categories")), "Signed in as <strong>bidder</strong>")
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bidder", password="secret")
+        self.listing = Listing.objects.create(
+            title="Lamp", description="A lamp", starting_bid=1, current_price=1, user=self.user
+        )
+
+    def get_json(self, url, data=None):
+        response = self.client.get(url, data or {})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_bids_walk_newest_first_by_cursor(self):
+        bids = Bid.objects.bulk_create([Bid(user=self.user, listing=self.listing, amount=i) for i in range(1, 6)])
+        url = reverse("api_bids", args=[self.listing.id])
+
+        first = self.get_json(url, {"limit": 2, "fields": "amount,bidder"})
+        self.assertEqual(first["results"], [{"amount": 5.0, "bidder": "bidder"}, {"amount": 4.0, "bidder": "bidder"}])
+        self.assertIsNone(first["previous"])
+        second = self.get_json(url, {"limit": 2, "cursor": first["next"]})
+        self.assertEqual([bid["amount"] for bid in second["results"]], [3.0, 2.0])
+        back = self.get_json(url, {"limit": 2, "cursor": second["previous"]})
+        self.assertEqual(back["results"], self.get_json(url, {"limit": 2})["results"])
+        last = self.get_json(url, {"limit": 2, "cursor": second["next"]})
+        self.assertEqual([bid["id"] for bid in last["results"]], [bids[0].id])
+        self.assertIsNone(last["next"])
+
+    async def test_asgi_pages_stream_asynchronously(self):
+        await Bid.objects.abulk_create([Bid(user=self.user, listing=self.listing, amount=i) for i in range(1, 6)])
+        url = reverse("api_bids", args=[self.listing.id])
+
+        async def get_json(data):
+            response = await self.async_client.get(url, data)
+            self.assertTrue(response.is_async)
+            return json.loads(b"".join([chunk async for chunk in response.streaming_content]))
+
+        first = await get_json({"limit": 2})
+        second = await get_json({"limit": 2, "cursor": first["next"]})
+        self.assertEqual([bid["amount"] for bid in second["results"]], [3.0, 2.0])
+        back = await get_json({"limit": 2, "cursor": second["previous"]})
+        self.assertEqual(back["results"], first["results"])
+        self.assertIsNone(back["previous"])
+
+    def test_query_count_does_not_depend_on_history_length(self):
+        url = reverse("api_bids", args=[self.listing.id])
+        for count in (1, 300):
+            Bid.objects.bulk_create([Bid(user=self.user, listing=self.listing, amount=1) for _ in range(count)])
+            with self.assertNumQueries(2):
+                self.get_json(url)
+
+    def test_field_selection_and_errors(self):
+        response = self.client.get(reverse("api_listing", args=[self.listing.id]), {"fields": "title,seller"})
+        self.assertEqual(response.json(), {"title": "Lamp", "seller": "bidder"})
+        self.assertEqual(self.client.get(reverse("api_listings"), {"fields": "title,secret"}).status_code, 400)
+        self.assertEqual(self.client.get(reverse("api_comments", args=[self.listing.id + 1])).status_code, 404)
+
+
+class StaticFilesTests(TestCase):
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+
+    def test_hashed_assets_are_precompressed_and_cached_for_good(self):
+        collected = {
+            "STATIC_ROOT": self.static_root,
+            "STORAGES": {
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": "auctions.staticfiles.CompressedManifestStaticFilesStorage"},
+            },
+        }
+        with self.settings(**collected), self.modify_settings(MIDDLEWARE={"prepend": "auctions.staticfiles.StaticFilesMiddleware"}):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            page = self.client.get(reverse("index")).content.decode()
+            bootstrap = re.search(r'href="(/static/auctions/vendor/bootstrap/bootstrap\.min\.\w+\.css)"', page).group(1)
+
+            response = self.client.get(bootstrap, HTTP_ACCEPT_ENCODING="gzip, deflate")
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(response["Content-Type"], "text/css")
+            self.assertEqual(response["Cache-Control"], "public, max-age=31536000, immutable")
+            self.assertLess(int(response["Content-Length"]), 50000)
+            response.close()
+
+            response = self.client.get(bootstrap, HTTP_ACCEPT_ENCODING="gzip;q=0")
+            self.assertFalse(response.has_header("Content-Encoding"))
+            response.close()
+            response = self.client.get("/static/auctions/styles.css")
+            self.assertEqual(response["Cache-Control"], "public, max-age=60")
+            response.close()
+
+    def test_uploads_are_served_without_debug(self):
+        os.makedirs(os.path.join(self.static_root, "listings"))
+        with open(os.path.join(self.static_root, "listings", "lamp.jpg"), "wb") as upload:
+            upload.write(b"jpeg")
+        with self.settings(MEDIA_ROOT=self.static_root, DEBUG=False), \
+                self.modify_settings(MIDDLEWARE={"prepend": "auctions.staticfiles.MediaFilesMiddleware"}):
+            response = self.client.get("/media/listings/lamp.jpg", HTTP_ACCEPT_ENCODING="gzip")
+            self.assertEqual(b"".join(response.streaming_content), b"jpeg")
+            self.assertEqual(response["Content-Type"], "image/jpeg")
+            self.assertEqual(response["Cache-Control"], "public, max-age=60")
+            self.assertFalse(response.has_header("Content-Encoding"))
+            response.close()
+            self.assertEqual(self.client.get("/media/../settings.py").status_code, 400)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user("seller", password="password")
+        self.bidder = User.objects.create_user("bidder", password="password")
+        self.old, self.recent = Listing.objects.bulk_create([
+            Listing(title="Old lamp", description="d", starting_bid=1, current_price=1, user=self.seller),
+            Listing(title="Recent lamp", description="d", starting_bid=1, current_price=1, user=self.seller),
+        ])
+        for listing in (self.old, self.recent):
+            bidding.place_bid(self.bidder, listing.id, 2)
+            Comment.objects.create(user=self.bidder, listing=listing, comment="Still works?")
+            Watchlist.objects.create(user=self.bidder, listing=listing)
+        close_listings(Listing.objects.all())
+        Listing.objects.filter(pk=self.old.id).update(closed_at=timezone.now() - timedelta(days=31))
+
+    def test_moves_old_closed_listings_with_their_history(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive_closed_listings(batch_size=1), 1)
+
+        self.assertQuerySetEqual(Listing.objects.values_list("id", flat=True), [self.recent.id])
+        self.assertFalse(Bid.objects.filter(listing_id=self.old.id).exists())
+        self.assertFalse(Watchlist.objects.filter(listing_id=self.old.id).exists())
+        archived = ArchivedListing.objects.get(pk=self.old.id)
+        self.assertEqual((archived.winner, archived.current_price), (self.bidder, 2))
+        self.assertEqual(ArchivedBid.objects.get(listing=archived).amount, 2)
+
+    def test_archives_everything_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(archive_listings(Listing.objects.filter(is_active=False), batch_size=1), 2)
+        # One transaction per listing, and an empty one to find none are left
+        self.assertEqual(sum(query["sql"].startswith("SAVEPOINT") for query in queries), 3)
+        self.assertFalse(Listing.objects.exists())
+
+    def test_archived_pages_still_resolve(self):
+        archive_closed_listings()
+        self.client.force_login(self.bidder)
+        response = self.client.get(reverse("listings", args=[self.old.id]))
+        self.assertContains(response, "Old lamp")
+        self.assertContains(response, "Archived")
+        self.assertContains(response, "Still works?")
+        self.assertNotContains(response, "Add comment")
+        self.assertEqual(self.client.get(reverse("watchlist")).context["watchlist_count"], 1)
+
+    def test_archived_wins_stay_in_my_bids(self):
+        archive_closed_listings()
+        self.assertFalse(BidSummary.objects.filter(listing_id=self.old.id).exists())
+        self.client.force_login(self.bidder)
+        response = self.client.get(reverse("my_bids"))
+        sections = {title: [summary.listing.title for summary in summaries] for title, summaries in response.context["sections"]}
+        self.assertEqual(sections, {"Winning": [], "Outbid": [], "Won": ["Recent lamp", "Old lamp"], "Lost": []})
+        self.assertContains(response, reverse("listings", args=[self.old.id]))
+
+
+class NotificationTests(TestCase):
+    class ListSink:
+        def __init__(self, fail=False):
+            self.fail = fail
+            self.delivered = []
+
+        def deliver(self, notifications):
+            if self.fail:
+                raise ConnectionError("sink down")
+            self.delivered.extend(notifications)
+
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", password="password")
+        self.first = User.objects.create_user("first", password="password")
+        self.second = User.objects.create_user("second", password="password")
+        self.listing = Listing.objects.create(title="Lamp", description="d", starting_bid=1, current_price=1, user=self.seller)
+
+    def test_bids_and_closing_queue_events(self):
+        bidding.place_bid(self.first, self.listing.id, 2)
+        bidding.place_bid(self.first, self.listing.id, 3)
+        with self.assertRaises(bidding.BidError):
+            bidding.place_bid(self.second, self.listing.id, 3)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        bidding.place_bid(self.second, self.listing.id, 4)
+        close_listings(Listing.objects.filter(pk=self.listing.id))
+        self.assertQuerySetEqual(
+            OutboxEvent.objects.order_by("id").values_list("kind", "user__username", "amount"),
+            [("outbid", "first", 4), ("won", "second", 4)],
+        )
+
+    def test_failing_to_queue_an_event_rolls_back_the_bid(self):
+        bidding.place_bid(self.first, self.listing.id, 2)
+        with patch.object(OutboxEvent.objects, "create", side_effect=OperationalError("disk I/O error")):
+            with self.assertRaises(OperationalError):
+                bidding.place_bid(self.second, self.listing.id, 3)
+
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.current_price, self.listing.leading_bidder_id), (2, self.first.id))
+        self.assertEqual(Bid.objects.filter(listing=self.listing).count(), 1)
+        self.assertEqual(BidSummary.objects.get(user=self.first, listing=self.listing).is_leading, True)
+        self.assertFalse(BidSummary.objects.filter(user=self.second).exists())
+
+    def test_worker_coalesces_outbids_and_keeps_events_on_failure(self):
+        for amount in (2, 4, 6):
+            bidding.place_bid(self.first, self.listing.id, amount)
+            bidding.place_bid(self.second, self.listing.id, amount + 1)
+
+        with self.assertRaises(ConnectionError):
+            notifications.deliver_batch(self.ListSink(fail=True))
+        self.assertEqual(OutboxEvent.objects.count(), 5)
+
+        sink = self.ListSink()
+        result = notifications.drain(sink)
+        self.assertEqual((result["events"], result["notifications"], result["backlog"]), (5, 2, 0))
+        self.assertEqual(
+            sorted((n["user_id"], n["amount"], n["events"]) for n in sink.delivered),
+            [(self.first.id, 7, 3), (self.second.id, 6, 2)],
+        )
+
+
+class BidSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seller = User.objects.create_user("seller", password="password")
+        self.first = User.objects.create_user("first", password="password")
+        self.second = User.objects.create_user("second", password="password")
+        self.lamp, self.vase = Listing.objects.bulk_create([
+            Listing(title="Lamp", description="d", starting_bid=1, current_price=1, user=seller),
+            Listing(title="Vase", description="d", starting_bid=1, current_price=1, user=seller),
+        ])
+        bidding.place_bid(self.first, self.lamp.id, 2)
+        bidding.place_bid(self.second, self.lamp.id, 3)
+        bidding.place_bid(self.first, self.vase.id, 5)
+        close_listings(Listing.objects.filter(pk=self.vase.id))
+
+    def summaries(self):
+        return set(BidSummary.objects.values_list("user__username", "listing__title", "max_bid", "is_leading", "is_closed"))
+
+    def test_bids_and_closing_keep_summaries_current(self):
+        expected = {
+            ("first", "Lamp", 2, False, False),
+            ("second", "Lamp", 3, True, False),
+            ("first", "Vase", 5, True, True),
+        }
+        self.assertEqual(self.summaries(), expected)
+        bidding.rebuild_bid_summaries(batch_size=1)
+        self.assertEqual(self.summaries(), expected)
+
+    def test_dashboard_is_one_read(self):
+        self.client.force_login(self.first)
+        self.client.get(reverse("my_bids"))
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("my_bids"))
+        sections = {title: [summary.listing.title for summary in summaries] for title, summaries in response.context["sections"]}
+        self.assertEqual(sections, {"Winning": [], "Outbid": ["Lamp"], "Won": ["Vase"], "Lost": []})
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user("seller", password="password")
+        self.bidder = User.objects.create_user("bidder", password="password")
+        self.lamp, self.vase = Listing.objects.bulk_create([
+            Listing(title="Lamp", description="d", starting_bid=1, current_price=1, user=self.seller),
+            Listing(title="Vase", description="d", starting_bid=1, current_price=1, user=self.seller),
+        ])
+        bidding.place_bid(self.bidder, self.lamp.id, 2)
+        Comment.objects.bulk_create([
+            Comment(user=self.bidder, listing=self.lamp, comment="Nice"),
+            Comment(user=self.bidder, listing=self.vase, comment="Nice"),
+        ])
+        self.client.force_login(User.objects.create_superuser("admin", password="password"))
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        url = reverse("admin:auctions_bid_changelist")
+        self.client.get(url)  # Caches the session and user
+        before = self.changelist_queries(url)
+        for amount in range(3, 13):
+            bidding.place_bid(self.bidder if amount % 2 else self.seller, self.vase.id, amount)
+        self.assertEqual(self.changelist_queries(url), before)
+
+    def test_estimated_count(self):
+        self.assertEqual(admin.EstimatedCountPaginator(Listing.objects.all(), 10).count, self.vase.id)
+        with patch.object(admin.EstimatedCountPaginator, "COUNT_LIMIT", 1):
+            self.assertEqual(admin.EstimatedCountPaginator(Listing.objects.filter(is_active=True), 10).count, 1)
+
+    def test_search_by_id_or_username(self):
+        url = reverse("admin:auctions_listing_changelist")
+        self.assertEqual(list(self.client.get(url, {"q": self.vase.id}).context["cl"].result_list), [self.vase])
+        self.assertEqual(len(self.client.get(url, {"q": "seller"}).context["cl"].result_list), 2)
+        self.assertEqual(len(self.client.get(url, {"q": "nobody"}).context["cl"].result_list), 0)
+
+    def test_bulk_actions(self):
+        url = reverse("admin:auctions_listing_changelist")
+        selected = [self.lamp.id, self.vase.id]
+        self.client.post(url, {"action": "purge_comments", "_selected_action": selected})
+        self.assertFalse(Comment.objects.exists())
+        self.client.post(url, {"action": "close_selected", "_selected_action": selected})
+        self.assertFalse(Listing.objects.filter(is_active=True).exists())
+        self.lamp.refresh_from_db()
+        self.assertEqual(self.lamp.winner, self.bidder)
+
+    def test_edits_and_deletes_keep_counts_and_pages_current(self):
+        lighting = Category.objects.create(name="Lighting", active_count=2)
+        Listing.objects.update(category=lighting)
+        Watchlist.objects.create(user=self.bidder, listing=self.vase)
+        self.assertEqual(caching.watchlist_count(self.bidder.id), 1)
+        version = caching.listing_version(self.lamp.id)
+        listing_admin = admin.admin.site._registry[Listing]
+        request = RequestFactory().post("/")
+        request.user = self.seller
+
+        lamp = Listing.objects.get(pk=self.lamp.id)
+        lamp.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            listing_admin.save_model(request, lamp, None, True)
+        lamp.refresh_from_db()
+        self.assertEqual((lamp.is_active, lamp.winner), (False, self.bidder))
+        self.assertTrue(BidSummary.objects.get(listing=lamp).is_closed)
+        self.assertTrue(OutboxEvent.objects.filter(kind=OutboxEvent.WON, listing_id=lamp.id).exists())
+        self.assertEqual(Category.objects.get(pk=lighting.pk).active_count, 1)
+        self.assertNotEqual(caching.listing_version(self.lamp.id), version)
+
+        lamp.is_active = True
+        with self.captureOnCommitCallbacks(execute=True):
+            listing_admin.save_model(request, lamp, None, True)
+        lamp.refresh_from_db()
+        self.assertEqual((lamp.winner, lamp.closed_at), (None, None))
+        self.assertFalse(BidSummary.objects.get(listing=lamp).is_closed)
+        self.assertEqual(Category.objects.get(pk=lighting.pk).active_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("admin:auctions_listing_delete", args=[self.vase.id]), {"post": "yes"})
+        self.assertFalse(Listing.objects.filter(pk=self.vase.id).exists())
+        self.assertEqual(Category.objects.get(pk=lighting.pk).active_count, 1)
+        self.assertEqual(caching.watchlist_count(self.bidder.id), 0)
+
+
+class PaginationTests(TestCase):
+    ordering = ("-created_at", "-id")
+
+    def setUp(self):
+        seller = User.objects.create_user("seller", password="password")
+        Listing.objects.bulk_create([
+            Listing(title=f"Listing {i}", description="d", starting_bid=1, current_price=1, user=seller)
+            for i in range(7)
+        ])
+        # Four listings share a timestamp, so pages must break ties on id
+        now = timezone.now()
+        ids = list(Listing.objects.order_by("id").values_list("id", flat=True))
+        Listing.objects.filter(id__in=ids[:4]).update(created_at=now - timedelta(hours=1))
+        Listing.objects.filter(id__in=ids[4:]).update(created_at=now)
+        self.expected = list(Listing.objects.order_by(*self.ordering))
+
+    def walk(self, per_page):
+        pages = [paginate(Listing.objects.all(), self.ordering, per_page=per_page)]
+        while pages[-1].next_cursor:
+            pages.append(paginate(Listing.objects.all(), self.ordering, cursor=pages[-1].next_cursor, per_page=per_page))
+        return pages
+
+    def test_pages_walk_forward_and_back_across_ties(self):
+        pages = self.walk(per_page=3)
+        self.assertEqual([listing for page in pages for listing in page], self.expected)
+        self.assertIsNone(pages[0].previous_cursor)
+        for previous, page in zip(pages, pages[1:]):
+            back = paginate(Listing.objects.all(), self.ordering, cursor=page.previous_cursor, per_page=3)
+            self.assertEqual(back.items, previous.items)
+
+    def test_malformed_cursors_give_the_first_page(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        first = paginate(Listing.objects.all(), self.ordering, per_page=3).items
+        for cursor in ["not a cursor", encode([True, 5]), encode([True, [None, None]]), encode(["yes", ["2020-01-01T00:00:00", 1]]),
+                       encode([False, [[1], 1]]), encode([False, ["yesterday", 1]]), encode({"a": 1})]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(paginate(Listing.objects.all(), self.ordering, cursor=cursor, per_page=3).items, first)
+                self.assertEqual(self.client.get(reverse("index"), {"cursor": cursor}).status_code, 200)
+                response = self.client.get(reverse("api_listings"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 200)
+                b"".join(response.streaming_content)
+
+    def test_feed_pages_read_the_partial_index(self):
+        cursor = paginate(Listing.objects.all(), self.ordering, per_page=3).next_cursor
+        for data in ({}, {"cursor": cursor}):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse("index"), data)
+            sql = next(query["sql"] for query in queries if "auctions_listing" in query["sql"])
+            with connection.cursor() as explain:
+                explain.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(row[-1] for row in explain.fetchall())
+            self.assertIn("listing_active_created_idx", plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user("author", password="password")
+        self.reader = User.objects.create_user("reader", password="password")
+        self.listing = Listing.objects.create(
+            title="Lamp", description="A lamp", starting_bid=1, current_price=1, user=self.author
+        )
+        self.comment = Comment.objects.create(user=self.author, listing=self.listing, comment="First!")
+        self.url = reverse("listings", args=[self.listing.id])
+
+    def comment_queries(self, user):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        return response, [query for query in queries if "auctions_comment" in query["sql"]]
+
+    def test_thread_is_rendered_once_for_all_viewers(self):
+        response, queries = self.comment_queries(self.author)
+        self.assertTrue(queries)
+        self.assertContains(response, f'.comment-delete[data-author="{self.author.id}"]')
+
+        response, queries = self.comment_queries(self.reader)
+        self.assertEqual(queries, [])
+        self.assertContains(response, "First!")
+        self.assertContains(response, f'.comment-delete[data-author="{self.reader.id}"]')
+        self.assertNotContains(response, f'.comment-delete[data-author="{self.author.id}"]')
+
+    def test_adding_and_deleting_comments_refresh_the_thread(self):
+        self.client.force_login(self.reader)
+        self.client.get(self.url)
+        self.client.post(reverse("add_comment"), {"listing": self.listing.id, "comment": "Second!"})
+        self.assertContains(self.client.get(self.url), "Second!")
+
+        # Only the author may delete their comment, whatever the page shows
+        self.assertEqual(self.client.post(reverse("delete_comment"), {"comment_id": self.comment.id}).status_code, 404)
+        self.client.force_login(self.author)
+        self.client.post(reverse("delete_comment"), {"comment_id": self.comment.id})
+        response = self.client.get(self.url)
+        self.assertNotContains(response, "First!")
+        self.assertContains(response, "Second!")
+
+
+class WatchlistCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("watcher", password="password")
+        self.listings = Listing.objects.bulk_create(
+            Listing(title=f"Item {i}", description="An item", starting_bid=1, current_price=1, user=self.user)
+            for i in range(3)
+        )
+        self.client.force_login(self.user)
+
+    def test_badge_costs_no_queries_once_cached(self):
+        Watchlist.objects.create(user=self.user, listing=self.listings[0])
+        with self.assertNumQueries(1):
+            self.assertEqual(caching.watchlist_count(self.user.id), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(caching.watchlist_count(self.user.id), 1)
+
+        self.client.get(reverse("categories"))
+        # Only the category list; session, user and badge come from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("categories"))
+        self.assertEqual(response.context["watchlist_count"], 1)
+
+    def test_adding_and_removing_keep_the_cached_count_correct(self):
+        caching.watchlist_count(self.user.id)
+        for listing in self.listings:
+            self.client.get(reverse("to_watchlist", args=[listing.id]))
+        self.client.get(reverse("to_watchlist", args=[self.listings[0].id]))
+        with self.assertNumQueries(0):
+            self.assertEqual(caching.watchlist_count(self.user.id), 2)
+        self.assertEqual(Watchlist.objects.filter(user=self.user).count(), 2)
+
+    def test_changes_while_uncached_are_counted_on_the_next_read(self):
+        self.client.get(reverse("to_watchlist", args=[self.listings[0].id]))
+        cache.delete(f"watchlist:count:{self.user.id}")
+        self.client.get(reverse("to_watchlist", args=[self.listings[1].id]))
+        with self.assertNumQueries(1):
+            self.assertEqual(caching.watchlist_count(self.user.id), 2)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user("seller", password="password")
+        self.lamp = self.create("Brass lamp", "A reading lamp")
+        self.desk = self.create("Oak desk", "Fits a brass lamp")
+
+    def create(self, title, description):
+        return Listing.objects.create(title=title, description=description, starting_bid=1, current_price=1, user=self.seller)
+
+    def titles(self, query):
+        return [listing.title for listing in search_listings(query)]
+
+    def test_title_matches_rank_above_description_matches(self):
+        self.assertEqual(self.titles("brass"), ["Brass lamp", "Oak desk"])
+        self.assertEqual(self.titles("brass oak"), ["Oak desk"])
+
+    def test_words_match_as_prefixes_and_without_accents(self):
+        self.create("Café table", "Marble top")
+        self.assertEqual(self.titles("lam"), ["Brass lamp", "Oak desk"])
+        self.assertEqual(self.titles("cafe"), ["Café table"])
+        self.assertEqual(self.titles("!!"), [])
+
+    def test_index_follows_edits_closing_and_deletion(self):
+        self.lamp.title = "Copper lantern"
+        self.lamp.save()
+        self.assertEqual(self.titles("copper"), ["Copper lantern"])
+        self.assertEqual(self.titles("brass"), ["Oak desk"])
+
+        close_listings(Listing.objects.filter(pk=self.desk.pk))
+        self.assertEqual(self.titles("brass"), [])
+
+        self.lamp.delete()
+        self.assertEqual(self.titles("copper"), [])
+        self.assertEqual(search.rebuild(), 0)
+
+    def test_rebuild_indexes_active_listings_only(self):
+        close_listings(Listing.objects.filter(pk=self.desk.pk))
+        self.assertEqual(search.rebuild(), 1)
+        self.assertEqual(self.titles("brass"), ["Brass lamp"])
+
+    def test_other_databases_fall_back_to_icontains(self):
+        with patch.object(connection, "vendor", "postgresql"):
+            self.assertEqual(self.titles("BRASS LAMP"), ["Oak desk", "Brass lamp"])
+
+    def test_search_page(self):
+        response = self.client.get(reverse("search"), {"q": "desk"})
+        self.assertEqual(list(response.context["listings"]), [self.desk])
+
+
+class ImportExportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.seller = User.objects.create_user("seller", password="secret")
+        self.importer = User.objects.create_user("importer", password="secret")
+        self.maps = Category.objects.create(name="Maps")
+        Listing.objects.create(
+            title="Atlas", description="A world atlas", starting_bid=5, current_price=5, category=self.maps, user=self.seller
+        )
+        Listing.objects.create(title="Lamp", description="A lamp", starting_bid=2.5, current_price=2.5, user=self.seller)
+
+    def round_trip(self, file_format, bad_row):
+        path = f"{self.directory}/listings.{file_format}"
+        call_command("export_listings", output=path, stderr=io.StringIO())
+        with open(path, "a", encoding="utf-8", newline="") as exported:
+            exported.write(bad_row)
+        out, err = io.StringIO(), io.StringIO()
+        call_command("import_listings", path, user="importer", stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_round_trip(self):
+        for file_format, bad_row, line in [
+            ("csv", ',,No title,abc,,,,,,,\r\n', 4),
+            ("jsonl", '{"description": "No title", "starting_bid": "abc"}\n', 3),
+        ]:
+            with self.subTest(file_format):
+                out, err = self.round_trip(file_format, bad_row)
+                self.assertIn("Imported 2 listings, rejected 1", out)
+                self.assertIn(f"Row {line}: title:", err)
+                self.assertIn("starting_bid:", err)
+
+                imported = Listing.objects.filter(user=self.importer)
+                self.assertEqual(
+                    sorted(imported.values_list("title", "starting_bid", "current_price", "category__name")),
+                    [("Atlas", 5, 5, "Maps"), ("Lamp", 2.5, 2.5, None)],
+                )
+                imported.delete()
+
+    def test_round_trip_keeps_closed_listings_closed(self):
+        # Whole seconds: JSON Lines keeps datetimes to the millisecond
+        closed_at = (timezone.now() - timedelta(days=2)).replace(microsecond=0)
+        Listing.objects.create(
+            title="Globe", description="A globe", starting_bid=3, current_price=8, category=self.maps, user=self.seller,
+            ends_at=closed_at, is_active=False, closed_at=closed_at,
+        )
+        for file_format in ("csv", "jsonl"):
+            with self.subTest(file_format):
+                Category.objects.filter(pk=self.maps.pk).update(active_count=0)
+                out, err = self.round_trip(file_format, "")
+                self.assertIn("Imported 3 listings, rejected 0", out)
+                self.assertEqual(err, "")
+
+                imported = Listing.objects.filter(user=self.importer)
+                self.assertEqual(
+                    sorted(imported.values_list("title", "current_price", "is_active", "ends_at", "closed_at")),
+                    [
+                        ("Atlas", 5, True, None, None),
+                        ("Globe", 8, False, closed_at, closed_at),
+                        ("Lamp", 2.5, True, None, None),
+                    ],
+                )
+                self.assertEqual(Category.objects.get(pk=self.maps.pk).active_count, 1)
+                imported.delete()
@@ -1,19 +1,34 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import api, async_views, views
 
-urlpatterns = [
-    path("", views.index, name="index"),
-    path("login", views.login_view, name="login"),
-    path("logout", views.logout_view, name="logout"),
-    path("register", views.register, name="register"),
-    path("categories", views.categories, name="categories"),
-    path("create_listing", views.create_listing, name="create_listing"),
-    path("close_listing/<int:id>", views.close_listing, name="close_listing"),
-    path("listings/<int:id>", views.listings, name="listings"),
-    path("watchlist", views.watchlist, name="watchlist"),
-    path("to_watchlist/<int:id>", views.to_watchlist, name="to_watchlist"),
-    path("place_bid/<int:id>", views.place_bid, name="place_bid"),
-    path("add_comment", views.add_comment, name="add_comment"),
-    path("delete_comment", views.delete_comment, name="delete_comment"),
-]
+
+def build_urlpatterns(read_views):
+    """The app's URLs, with the read-heavy pages served by read_views."""
+    return [
+        path("", read_views.index, name="index"),
+        path("login", views.login_view, name="login"),
+        path("logout", views.logout_view, name="logout"),
+        path("register", views.register, name="register"),
+        path("search", views.search, name="search"),
+        path("categories", read_views.categories, name="categories"),
+        path("create_listing", views.create_listing, name="create_listing"),
+        path("close_listing/<int:id>", views.close_listing, name="close_listing"),
+        path("listings/<int:id>", read_views.listings, name="listings"),
+        path("listings/<int:id>/events", views.listing_events, name="listing_events"),
+        path("watchlist", read_views.watchlist, name="watchlist"),
+        path("my_bids", views.my_bids, name="my_bids"),
+        path("to_watchlist/<int:id>", views.to_watchlist, name="to_watchlist"),
+        path("place_bid/<int:id>", views.place_bid, name="place_bid"),
+        path("add_comment", views.add_comment, name="add_comment"),
+        path("delete_comment", views.delete_comment, name="delete_comment"),
+        path("metrics", views.metrics, name="metrics"),
+        path("api/listings", api.listings, name="api_listings"),
+        path("api/listings/<int:id>", api.listing, name="api_listing"),
+        path("api/listings/<int:id>/bids", api.bids, name="api_bids"),
+        path("api/listings/<int:id>/comments", api.comments, name="api_comments"),
+    ]
+
+
+urlpatterns = build_urlpatterns(async_views if settings.ASYNC_READ_VIEWS else views)
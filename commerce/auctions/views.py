@@ -1,56 +1,131 @@
+import asyncio
+from itertools import chain
+
 from django import forms
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import render, redirect
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, OperationalError, transaction
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
-
-from .models import User, Listing, Bid, Comment, Watchlist
-
-CATEGORIES = ["Books", "Electronics", "Fashion", "Food", "Furniture", "Gadgets", "Health", "Home", "Property", "Sports", "Toys"]
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+
+from . import bidding, instrumentation, live
+from .caching import (
+    adjust_watchlist_count, bump_comments_version, bump_listing_versions, cache_anonymous_page, comments_version,
+    feed_version, listing_version, page_etag, page_last_modified,
+)
+from .categories import adjust_active_counts
+from .closing import close_listings
+from .images import generate_thumbnails_on_commit
+from .models import User, Category, Listing, BidSummary, Comment, Watchlist, ArchivedListing, ArchivedBidSummary, ArchivedComment
+from .pagination import paginate
+from .search import search_listings
 
 class ListingForm(forms.Form):
-    CATEGORY_CHOICES = [("", "Select a category")] + [(category, category) for category in CATEGORIES]
-
     title = forms.CharField(max_length=200, required=True, label="", widget=forms.TextInput(attrs={"class": "form-control mb-3", "placeholder": "Enter your title"}))
     description = forms.CharField(max_length=200, required=True, label="", widget=forms.Textarea(attrs={"class": "form-control mb-3", "placeholder": "A short description", "rows" : "3"}))
     starting_bid = forms.FloatField(min_value=0, required=True, label="", widget=forms.NumberInput(attrs={"class": "form-control mb-3", "placeholder": "Starting bid"}))
     image_url = forms.CharField(max_length=200, required=False, label="", widget=forms.TextInput(attrs={"class": "form-control mb-3", "placeholder": "Enter image url (Optional)"}))
-    category = forms.ChoiceField(choices=CATEGORY_CHOICES, required=False, label="", widget=forms.Select(attrs={"class": "form-control mb-3"}))
+    image = forms.ImageField(required=False, label="Or upload an image (optional)", widget=forms.FileInput(attrs={"class": "form-control mb-3", "accept": "image/*"}))
+    category = forms.ChoiceField(required=False, label="", widget=forms.Select(attrs={"class": "form-control mb-3"}))
+    ends_at = forms.DateTimeField(required=False, label="Ends at (optional)", widget=forms.DateTimeInput(attrs={"class": "form-control mb-3", "type": "datetime-local"}))
+
+    def __init__(self, *args, categories=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Callers validating many rows load the categories once and pass them in
+        if categories is None:
+            categories = load_categories()
+        self.categories = categories
+        self.fields["category"].choices = [("", "Select a category")] + [(name, name) for name in self.categories]
+
+    def clean_category(self):
+        return self.categories.get(self.cleaned_data["category"])
+
+    def clean_image(self):
+        image = self.cleaned_data["image"]
+        if image and image.size > settings.MAX_IMAGE_UPLOAD_SIZE:
+            raise forms.ValidationError(f"Images can be at most {settings.MAX_IMAGE_UPLOAD_SIZE // (1024 * 1024)} MB.")
+        return image
+
+    def clean_ends_at(self):
+        ends_at = self.cleaned_data["ends_at"]
+        if ends_at and ends_at <= timezone.now():
+            raise forms.ValidationError("The end time must be in the future.")
+        return ends_at
+
+
+def load_categories():
+    """Every category by name, in the form ListingForm takes them."""
+    return {category.name: category for category in Category.objects.order_by("name")}
 
 
+@condition(etag_func=page_etag(feed_version), last_modified_func=page_last_modified(feed_version))
+@cache_anonymous_page(feed_version)
 def index(request):
     category_name = request.GET.get('category')
+    listings = Listing.objects.filter(is_active=True)
     if category_name:
-        listings = Listing.objects.filter(category=category_name, is_active=True)
-    else:
-        listings = Listing.objects.filter(is_active=True)
+        listings = listings.filter(category__name=category_name)
+
+    page = paginate(
+        listings,
+        ("-created_at", "-id"),
+        cursor=request.GET.get("cursor"),
+        per_page=settings.LISTINGS_PER_PAGE,
+    )
 
     return render(request, "auctions/index.html", {
-        "listings": listings,
+        "listings": page,
         "category_name": category_name,
     })
 
 
+def search(request):
+    query = request.GET.get("q", "").strip()
+    per_page = settings.LISTINGS_PER_PAGE
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    results = search_listings(query, limit=per_page + 1, offset=(page - 1) * per_page)
+
+    return render(request, "auctions/search.html", {
+        "query": query,
+        "listings": results[:per_page],
+        "previous_page": page - 1 if page > 1 else None,
+        "next_page": page + 1 if len(results) > per_page else None,
+    })
+
+
 def categories(request):
     return render(request, "auctions/categories.html", {
-        "categories": CATEGORIES,
+        "categories": Category.objects.order_by("name"),
     })
 
 
 @login_required
 def create_listing(request):
     if request.method == "POST":
-        form = ListingForm(request.POST)
+        form = ListingForm(request.POST, request.FILES)
 
         if form.is_valid():
             title = form.cleaned_data["title"]
             description = form.cleaned_data["description"]
             starting_bid = form.cleaned_data["starting_bid"]
             image_url = form.cleaned_data["image_url"]
+            image = form.cleaned_data["image"]
             category = form.cleaned_data["category"]
+            ends_at = form.cleaned_data["ends_at"]
             user = request.user
 
             listing = Listing(
@@ -59,70 +134,186 @@ def create_listing(request):
                 starting_bid=starting_bid,
                 current_price=starting_bid,
                 image_url=image_url,
+                image=image,
                 category=category,
+                ends_at=ends_at,
                 user=user,
             )
 
-            listing.save()
+            with transaction.atomic():
+                listing.save()
+                adjust_active_counts([listing.category_id], 1)
+                if image:
+                    generate_thumbnails_on_commit(listing.id)
+                transaction.on_commit(lambda: bump_listing_versions([]))
 
             return HttpResponseRedirect(reverse("index"))
 
         else:
             return render(request, "auctions/create.html", {
-                "categories": CATEGORIES,
                 "form": form,
             })
 
     return render(request, "auctions/create.html", {
-        "categories": CATEGORIES,
-        "form": ListingForm,
+        "form": ListingForm(),
     })
 
 
 @login_required
 def close_listing(request, id):
-    listing = Listing.objects.get(pk=id, user=request.user)
-    listing.is_active = False
-    listing.save()
+    close_listings(Listing.objects.filter(pk=id, user=request.user))
 
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
-@login_required
+def listing_page_version(id):
+    return listing_version(id)
+
+
+@condition(
+    etag_func=page_etag(listing_page_version, for_users=False),
+    last_modified_func=page_last_modified(listing_page_version, for_users=False),
+)
+@cache_anonymous_page(listing_page_version)
 def listings(request, id):
-    listing = Listing.objects.get(pk=id)
-    watchlisted = Watchlist.objects.filter(user=request.user, listing=listing)
-    bids = Bid.objects.filter(listing=listing)
-    comments = Comment.objects.filter(listing=listing)
+    try:
+        listing = Listing.objects.select_related("user", "category").get(pk=id)
+    except Listing.DoesNotExist:
+        return archived_listing(request, id)
+    watchlisted = (
+        request.user.is_authenticated
+        and Watchlist.objects.filter(user=request.user, listing=listing).exists()
+    )
 
     return render(request, "auctions/listings.html", {
         "listing": listing,
         "watchlisted": watchlisted,
-        "bids_count": bids.count,
-        "last_bider": bids.last().user if bids.exists() else None,
-        "comments": comments,
+        "comments": comment_thread(request, listing),
+    })
+
+
+def archived_listing(request, id):
+    """The read-only page of a listing that has been moved to the archive."""
+    try:
+        listing = ArchivedListing.objects.select_related("user", "category").get(pk=id)
+    except ArchivedListing.DoesNotExist:
+        raise Http404("No such listing.")
+
+    comments = ArchivedComment.objects.filter(listing=listing).select_related("user").order_by("id")
+    page = Paginator(comments, settings.COMMENTS_PER_PAGE).get_page(comments_page_number(request))
+    return render(request, "auctions/listings.html", {
+        "listing": listing,
+        "archived": True,
+        "comments": mark_safe(render_to_string("auctions/comments.html", {"comments": page})),
     })
 
 
+def comment_thread(request, listing):
+    """
+    Render one page of a listing's comments, cached until a comment is added
+    or deleted. Every viewer shares the fragment: it has a delete button on
+    each comment, and the listing page only shows the viewer's own. It is
+    read from the primary, since a replica's lag would outlive it.
+    """
+    page_number = comments_page_number(request)
+    key = comments_cache_key(listing.id, page_number)
+    html = cache.get(key)
+    if html is None:
+        comments = Comment.objects.using(DEFAULT_DB_ALIAS).filter(listing=listing).select_related("user").order_by("id")
+        page = Paginator(comments, settings.COMMENTS_PER_PAGE).get_page(page_number)
+        html = render_to_string("auctions/comments.html", {"comments": page})
+        cache.set(key, html, settings.COMMENTS_CACHE_TIMEOUT)
+
+    return mark_safe(html)
+
+
+def comments_page_number(request):
+    try:
+        return max(int(request.GET.get("comments_page", 1)), 1)
+    except ValueError:
+        return 1
+
+
+def comments_cache_key(listing_id, page_number):
+    return f"comments:{listing_id}:{comments_version(listing_id)}:{page_number}"
+
+
+async def listing_events(request, id):
+    # Streams are held open indefinitely, which only an ASGI server can
+    # afford. A 204 tells EventSource clients not to reconnect.
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    # Subscribe before reading the snapshot so no update can fall between.
+    queue = live.broker.subscribe(id)
+    try:
+        listing = await Listing.objects.aget(pk=id)
+    except Listing.DoesNotExist:
+        live.broker.unsubscribe(id, queue)
+        raise Http404("No such listing.")
+
+    snapshot = live.listing_event(listing.id, listing.current_price, listing.bid_count, listing.leading_bidder_id, listing.is_active)
+    response = StreamingHttpResponse(event_stream(id, queue, snapshot), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def event_stream(listing_id, queue, snapshot):
+    try:
+        yield live.format_event(snapshot)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield live.format_event(event)
+    finally:
+        live.broker.unsubscribe(listing_id, queue)
+
+
 @login_required
 def watchlist(request):
     return render(request, "auctions/watchlist.html", {
-        "watchlists": Watchlist.objects.filter(user=request.user),
+        "watchlists": Watchlist.objects.filter(user=request.user).select_related("listing").order_by("-id"),
+    })
+
+
+@login_required
+def my_bids(request):
+    """The listings the user has bid on, split by how they stand."""
+    sections = {"Winning": [], "Outbid": [], "Won": [], "Lost": []}
+    summaries = chain(
+        BidSummary.objects.filter(user=request.user).select_related("listing").order_by("-listing_id"),
+        ArchivedBidSummary.objects.filter(user=request.user).select_related("listing").order_by("-listing_id"),
+    )
+    for summary in summaries:
+        if summary.is_closed:
+            sections["Won" if summary.is_leading else "Lost"].append(summary)
+        else:
+            sections["Winning" if summary.is_leading else "Outbid"].append(summary)
+    return render(request, "auctions/my_bids.html", {
+        "sections": sections.items(),
     })
 
 
 @login_required
 def to_watchlist(request, id):
-    # Check if id already exists
     user = request.user
-    listing = Listing.objects.get(pk=id)
-    watchlist = Watchlist.objects.filter(user=user, listing=listing)
 
-    if watchlist.exists():
-        watchlist.delete()
+    # One write transaction: remove the entry, or add it if there was none.
+    # The unique constraint turns a racing double-click into an IntegrityError
+    # instead of a duplicate row.
+    try:
+        with transaction.atomic():
+            deleted, _ = Watchlist.objects.filter(user=user, listing_id=id).delete()
+            if not deleted:
+                Watchlist.objects.create(user=user, listing_id=id)
+    except IntegrityError:
+        pass
     else:
-        watchlist = Watchlist(user=user, listing=listing)
-        watchlist.save()
+        adjust_watchlist_count(user.id, -deleted if deleted else 1)
 
     return redirect(request.META.get('HTTP_REFERER', '/'))
 
@@ -130,33 +321,21 @@ def to_watchlist(request, id):
 @login_required
 def place_bid(request, id):
     if request.method == "POST":
-        user = request.user
-        listing = Listing.objects.get(pk=id, is_active=True)
-        bid_amount = float(request.POST["bid"])
-
-        # Check if no bids have been placed yet
-        if not Bid.objects.filter(listing=listing).exists():
-            if bid_amount >= listing.starting_bid:
-                bid = Bid(user=user, listing=listing, amount=bid_amount)
-                bid.save()
-                listing.current_price = bid_amount
-                listing.save()
-            else:
-                messages.error(request, "Bid amount must be at least the starting bid!")
-               
-        elif bid_amount > listing.current_price:
-            bid = Bid(user=user, listing=listing, amount=bid_amount)
-            bid.save()
-            listing.current_price = bid_amount
-            listing.save()
-        else:
-            messages.error(request, "Bid amount must be greater than the current price!")
+        try:
+            bidding.place_bid(request.user, id, float(request.POST["bid"]))
+        except ValueError:
+            messages.error(request, "Enter a valid bid amount!")
+        except bidding.BidError as error:
+            messages.error(request, str(error))
+        except OperationalError:
+            # The database stayed locked through every retry
+            messages.error(request, "Too many bids are being placed right now, please try again!")
 
         # Redirect back to the same page
         return redirect(request.META.get('HTTP_REFERER', '/'))
 
     # If the method is not POST, redirect to the listing page
-    return redirect("listing", id=id)
+    return redirect("listings", id=id)
 
 
 @login_required
@@ -168,6 +347,8 @@ def add_comment(request):
 
         comment = Comment(user=user, listing=listing, comment=comment)
         comment.save()
+        bump_comments_version(listing.id)
+        bump_listing_versions([listing.id], feed=False)
 
         return redirect(request.META.get('HTTP_REFERER', '/'))
 
@@ -176,12 +357,19 @@ def add_comment(request):
 def delete_comment(request):
     if request.method == "POST":
         user = request.user
-        comment = Comment.objects.get(pk=request.POST["comment_id"], user=user)
+        comment = get_object_or_404(Comment, pk=request.POST["comment_id"], user=user)
         comment.delete()
+        bump_comments_version(comment.listing_id)
+        bump_listing_versions([comment.listing_id], feed=False)
 
         return redirect(request.META.get('HTTP_REFERER', '/'))
 
 
+def metrics(request):
+    """Per-route request metrics for this process, for Prometheus to scrape."""
+    return HttpResponse(instrumentation.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def login_view(request):
     if request.method == "POST":
 
@@ -228,7 +416,8 @@ def register(request):
             return render(request, "auctions/register.html", {
                 "message": "Username already taken."
             })
-        login(request, user)
+        # Two backends are configured, so name the one to record
+        login(request, user, backend=settings.AUTHENTICATION_BACKENDS[0])
         return HttpResponseRedirect(reverse("index"))
     else:
         return render(request, "auctions/register.html")
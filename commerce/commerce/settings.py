@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'auctions.instrumentation.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,7 +55,7 @@ ROOT_URLCONF = 'commerce.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'auctions.instrumentation.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,11 +80,44 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # bidders wait on the busy timeout instead of failing with
+            # "database is locked" while upgrading a read lock.
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # A file rather than shared-cache memory, so tests that hit the
+            # database from several threads see real SQLite locking.
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
 AUTH_USER_MODEL = 'auctions.User'
 
+# Serve the session and the signed-in user from the cache, so a signed-in
+# page view needs no queries to know who is asking. Every worker process
+# must share the cache, or a logout or password change only reaches one of
+# them; settings_production requires a shared one. ModelBackend stays
+# listed for sessions signed in before the cached backend was added.
+AUTHENTICATION_BACKENDS = [
+    'auctions.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -121,6 +155,57 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 LOGIN_URL = '/login'
 
-CSRF_TRUSTED_ORIGINS = ["https://8000-idx-commerce-1731384246534.cluster-bec2e4635ng44w7ed22sa22hes.cloudworkstations.dev"]
\ No newline at end of file
+CSRF_TRUSTED_ORIGINS = ["https://8000-idx-commerce-1731384246534.cluster-bec2e4635ng44w7ed22sa22hes.cloudworkstations.dev"]
+
+# Auctions
+
+LISTINGS_PER_PAGE = 20
+COMMENTS_PER_PAGE = 50
+COMMENTS_CACHE_TIMEOUT = 300
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 1000
+# How long anonymous visitors may be shown a cached page
+PAGE_CACHE_TIMEOUT = 10
+# Page and comment version stamps are renewed at least this often, which
+# bounds how long a process with a cache of its own serves a stale page
+VERSION_CACHE_TIMEOUT = 300
+LIVE_KEEPALIVE_SECONDS = 15
+# Serve the read-heavy pages from auctions.async_views; only worth it under ASGI
+ASYNC_READ_VIEWS = False
+MAX_IMAGE_UPLOAD_SIZE = 5 * 1024 * 1024
+# Processes making thumbnails of uploaded images; 0 makes them in the request
+IMAGE_WORKERS = 2
+# Closed listings are moved to the archive tables this long after closing
+ARCHIVE_AFTER_DAYS = 30
+# Where deliver_notifications sends outbid and auction-won notifications;
+# auctions.notifications.FileSink with OPTIONS {"path": ...} writes JSON lines
+NOTIFICATION_SINK = {
+    'BACKEND': 'auctions.notifications.LogSink',
+}
+# The database alias PrimaryReplicaRouter reads from, when it is installed
+REPLICA_DATABASE = 'replica'
+# How long a browser keeps reading from the primary after it writes; longer
+# than the replica ever lags
+REPLICA_STICKY_SECONDS = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'auctions': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
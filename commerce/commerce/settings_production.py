@@ -0,0 +1,100 @@
+"""
+Production settings for commerce: the development settings plus a tuned
+SQLite primary, persistent connections, a cache shared by every worker
+and, when REPLICA_DATABASE_PATH is set, a read replica. Select them with
+DJANGO_SETTINGS_MODULE=commerce.settings_production.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
+
+# Persistent connections save a connect and the PRAGMAs below per request
+# under WSGI workers. Under ASGI requests may run on new threads, which
+# cannot reuse them, so set DATABASE_CONN_MAX_AGE=0 there.
+CONN_MAX_AGE = int(os.environ.get("DATABASE_CONN_MAX_AGE", 600))
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get("DATABASE_PATH", os.path.join(BASE_DIR, 'db.sqlite3')),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            # Busy timeout: wait up to 20s for the write lock
+            'timeout': 20,
+            # WAL lets readers carry on while a bid commits; NORMAL only
+            # syncs at checkpoints, which WAL makes safe against corruption.
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
+    }
+}
+
+# Page versions, rendered pages, sessions and signed-in users are cached.
+# Every worker process must see the same entries, or one keeps serving what
+# another has invalidated, so the per-process LocMemCache will not do.
+# CACHE_LOCATION is a Redis URL (redis://host:6379/0, needs the redis
+# package) or a Memcached host:port (needs pymemcache).
+CACHE_LOCATION = os.environ.get("CACHE_LOCATION")
+if not CACHE_LOCATION:
+    raise ImproperlyConfigured(
+        "Set CACHE_LOCATION to a Redis URL or a Memcached host:port shared by every worker process."
+    )
+CACHES = {
+    'default': {
+        'BACKEND': (
+            'django.core.cache.backends.redis.RedisCache'
+            if CACHE_LOCATION.startswith(("redis://", "rediss://", "unix://"))
+            else 'django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+
+if os.environ.get("REPLICA_DATABASE_PATH"):
+    DATABASES[REPLICA_DATABASE] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ["REPLICA_DATABASE_PATH"],
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'init_command': 'PRAGMA query_only=ON;',
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+    DATABASE_ROUTERS = ['auctions.routers.PrimaryReplicaRouter']
+    MIDDLEWARE = MIDDLEWARE[:1] + ['auctions.routers.PrimaryPinningMiddleware'] + MIDDLEWARE[1:]
+
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", REPLICA_STICKY_SECONDS))
+
+# Static files: run collectstatic on deploy. It writes content-hashed copies
+# with gzip and brotli variants, which StaticFilesMiddleware serves ahead of
+# the session and user lookups with immutable caching.
+STATIC_ROOT = os.environ.get("STATIC_ROOT", STATIC_ROOT)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'auctions.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Uploaded images: urls.py only serves MEDIA_ROOT while DEBUG is on, so
+# MediaFilesMiddleware serves it here. A front server that maps MEDIA_URL
+# to MEDIA_ROOT itself answers those requests before they reach the app.
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", MEDIA_ROOT)
+MIDDLEWARE = MIDDLEWARE[:1] + [
+    'auctions.staticfiles.StaticFilesMiddleware',
+    'auctions.staticfiles.MediaFilesMiddleware',
+] + MIDDLEWARE[1:]